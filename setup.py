@@ -30,6 +30,7 @@ TESTS_REQUIRE = (
     "flake8-logging-format",
     "flake8-mutable",
     "flake8-sorted-keys",
+    "mongomock",
     "pep8-naming",
     "pylint",
     "pytest",
@@ -54,6 +55,8 @@ setup(
         "console_scripts": (
             "project = project:Service.main",
             "project.ping = project:Service.main_ping",
+            "project.scheduled = project:Service.main_scheduled",
+            "project.benchmark = project.benchmark:main",
         )
     },
     extras_require={"tests": TESTS_REQUIRE},
@@ -67,5 +70,5 @@ setup(
     setup_requires=SETUP_REQUIRES,
     tests_require=TESTS_REQUIRE,
     url="https://github.com/pennsignals/microservice",
-    use_scm_version=True,
+    use_scm_version={"write_to": "src/project/version.py"},
 )
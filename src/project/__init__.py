@@ -3,25 +3,24 @@
 from __future__ import annotations
 
 from argparse import Namespace
-from logging import INFO, basicConfig, getLogger
-from sys import stdout
-
-from setuptools_scm import get_version
+from logging import getLogger
 
+from .batching import Batching, install as install_batching
 from .example_inputs import Inputs
 from .example_outputs import Outputs
+from .health import Health
 from .model import Model
 from .service import SimpleService as BaseService
+from .shard import Shards
+from .telemetry import Telemetry, install
 
-basicConfig(
-    level=INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    stream=stdout,
-)
 logger = getLogger(__name__)
 
 
-__version__ = get_version(root="../..", relative_to=__file__)
+try:
+    from .version import version as __version__
+except ImportError:  # pragma: no cover; written by setuptools_scm on build
+    __version__ = "unknown"
 
 
 class Service(BaseService):
@@ -29,6 +28,8 @@ class Service(BaseService):
 
     DESCRIPTION = "Describe your microservice here."
 
+    REQUIRED = ("inputs", "outputs", "model")
+
     ARGS = {**BaseService.ARGS, **Inputs.ARGS, **Outputs.ARGS}
 
     @classmethod
@@ -42,6 +43,11 @@ class Service(BaseService):
                 ("model", Model.from_cfg),
             )
         }
+        kwargs["health"] = Health.from_cfg(cfg.get("health"))
+        if cfg.get("shards") is not None:
+            kwargs["shards"] = Shards.from_cfg(cfg["shards"])
+        install(Telemetry.from_cfg(cfg.get("telemetry")))
+        install_batching(Batching.from_cfg(cfg.get("batching")))
         return cls(**kwargs)
 
     @classmethod
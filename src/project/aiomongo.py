@@ -0,0 +1,167 @@
+"""Async Mongo."""
+
+from __future__ import annotations
+
+from asyncio import get_running_loop
+from collections import Counter
+from contextlib import asynccontextmanager
+from logging import getLogger
+
+from pymongo.errors import BulkWriteError
+
+from .constants import BSON_BATCH_BYTES, BSON_BATCH_OPS, CHUNK_SIZE
+from .mongo import Clients, Mongo, cols, retry_on_reconnect
+
+try:
+    from motor.motor_asyncio import AsyncIOMotorClient
+except ImportError:  # pragma: no cover; motor is optional
+    AsyncIOMotorClient = None  # pylint: disable=invalid-name
+
+logger = getLogger(__name__)  # pylint: disable=invalid-name
+
+
+class AsyncMongo(Mongo):  # pylint: disable=abstract-method
+    """AsyncMongo.
+
+    Motor counterpart of Mongo for inputs gathered concurrently
+        (see Inputs.gather). Configuration is the same as Mongo.
+
+    from .aiomongo import AsyncMongo as BaseInput
+
+    class SignalsInput(BaseInput):
+        '''SignalsInput.'''
+        ...
+
+        @retry_on_reconnect()  # retries coroutines too
+        async def get_labs(self, patient_ids: set) -> DataFrame:
+            async with self.acollections() as collections:
+                return await self.afind_to_df(
+                    collections.labs,
+                    {"patient_id": {"$in": list(patient_ids)}},
+                )
+
+    A motor client is bound to the event loop it was created in, so
+        the client is cached for the running loop and replaced when
+        called from a new loop (each asyncio.run).
+    Async methods are a-prefixed (aconnection, adatabase, acollections,
+        afind_to_df, abulk_write, awrite_df), so the inherited sync
+        methods of Mongo (collections, find_to_dfs, cached_find_to_df,
+        write_df, ...) still work, over the shared pymongo client.
+    Serialization (df_to_bsonable, write_ops, bson_to_df buffers) is
+        shared with Mongo.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        """Initialize async mongo."""
+        super().__init__(*args, **kwargs)
+        self._loop = None
+        self._client = None
+
+    @asynccontextmanager
+    async def aconnection(self) -> None:
+        """Async contextmanager for the motor client of the running loop.
+
+        The pool cfg is the same as Mongo.connection.
+        """
+        if AsyncIOMotorClient is None:
+            raise ImportError("AsyncMongo requires motor")
+        loop = get_running_loop()
+        if self._loop is not loop:
+            if self._client is not None:
+                self._client.close()
+            kwargs = {
+                Clients.OPTIONS[name]: value
+                for name, value in self.pool.items()
+                if value is not None
+            }
+            self._client = AsyncIOMotorClient(self.uri, io_loop=loop, **kwargs)
+            self._loop = loop
+            logger.info('{"mongo.async": "open"}')
+        yield self._client
+
+    @asynccontextmanager
+    async def adatabase(self) -> None:
+        """Async contextmanager for the default database."""
+        async with self.aconnection() as connection:
+            yield connection.get_default_database()
+
+    @asynccontextmanager
+    async def acollections(self) -> None:
+        """Async contextmanager for collections.
+
+        async with signals.acollections() as collections:
+            await collections.flowsheets.find_one(...)
+        """
+        async with self.adatabase() as database:
+            kwargs = {
+                key: self.collection(database, key, value)
+                for key, value in self._collections._asdict().items()
+            }
+            yield self._collections.__class__(**kwargs)
+
+    @classmethod
+    async def afind_to_df(
+        cls, collection, query: dict, schema: dict = None, size=CHUNK_SIZE
+    ):
+        """Return dataframe of documents found in a motor collection.
+
+        Documents are fetched size at a time into typed column buffers
+            as in bson_to_df, yielding to the event loop between
+            batches.
+        """
+        projection = None if schema is None else cls.projection(schema)
+        cursor = collection.find(query, projection, batch_size=size)
+        paths, columns = cls._columns(schema)
+        count = 0
+        while True:
+            batch = await cursor.to_list(length=size)
+            if not batch:
+                break
+            count = cls._extend(batch, paths, columns, count, schema is None)
+            del batch
+        return cols.Column.to_df(list(columns.values()))
+
+    @classmethod
+    async def abulk_write(cls, collection, ops: list) -> dict:
+        """Write ops unordered to a motor collection, return counts.
+
+        Retries and duplicate key errors are handled as in
+            Mongo.bulk_write.
+        """
+        attempts = []
+
+        @retry_on_reconnect()
+        async def write(collection, ops):
+            retried = bool(attempts)
+            attempts.append(retried)
+            try:
+                result = await collection.bulk_write(ops, ordered=False)
+            except BulkWriteError as e:
+                return cls.bulk_error_counts(e, ops, retried)
+            return cls.bulk_counts(result)
+
+        return await write(collection, ops)
+
+    @classmethod
+    async def awrite_df(
+        cls,
+        collection,
+        df,
+        keys=None,
+        max_bytes=BSON_BATCH_BYTES,
+        max_ops=BSON_BATCH_OPS,
+    ) -> dict:
+        """Write df to a motor collection in size-bounded bulk writes.
+
+        async with my_output.acollections() as collections:
+            await my_output.awrite_df(collections.predictions, df)
+
+        Batches, adaptive sizes included, are those of Mongo.write_df,
+            see Mongo._write_batches.
+        """
+        counts = Counter()
+        for ops in cls._write_batches(
+            collection, df, counts, keys, max_bytes, max_ops
+        ):
+            counts.update(await cls.abulk_write(collection, ops))
+        return dict(counts)
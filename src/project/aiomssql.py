@@ -0,0 +1,99 @@
+"""Async Mssql."""
+
+from __future__ import annotations
+
+from asyncio import get_running_loop
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from logging import getLogger
+from threading import Lock
+
+from .mssql import Input, pd
+
+logger = getLogger(__name__)  # pylint: disable=invalid-name
+
+
+class AsyncInput(Input):  # pylint: disable=abstract-method
+    """AsyncInput.
+
+    pymssql has no async driver, so blocking units of work run in a
+        thread pool sized to the connection pool, each thread borrowing
+        its own pooled connection, while the event loop awaits them
+        alongside other inputs (see Inputs.gather):
+
+    from .aiomssql import AsyncInput as BaseInput
+
+    class Input(BaseInput):
+        ...
+
+        @retry_on_operational_error()  # retries coroutines too
+        async def get_labs(self, from_id, to_id) -> DataFrame:
+            return await self.query(
+                LABS, {"from_id": from_id, "to_id": to_id}
+            )
+
+    Configuration is the same as Input.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        """Initialize async input."""
+        super().__init__(*args, **kwargs)
+        self._executor = None
+        self._lock = Lock()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Return the thread pool, created on first use."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.uri.pool.size,
+                    thread_name_prefix="mssql",
+                )
+            return self._executor
+
+    async def run(self, func, *args, **kwargs):
+        """Return result of blocking func run in the thread pool."""
+        loop = get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, partial(func, *args, **kwargs)
+        )
+
+    async def query(self, query, params=None, size=None) -> pd.DataFrame:
+        """Return dataframe of query, run in the thread pool."""
+
+        def load():
+            with self.rollback() as cursor:
+                return self.query_to_df(cursor, query, params, size)
+
+        return await self.run(load)
+
+    async def registered_query(
+        self, name: str, params: dict = None, size=None
+    ) -> pd.DataFrame:
+        """Return dataframe of registered query name, run in the pool."""
+
+        def load():
+            with self.rollback() as cursor:
+                return self.registered_query_to_df(cursor, name, params, size)
+
+        return await self.run(load)
+
+    async def cached_query(  # pylint: disable=too-many-arguments
+        self, query, params=None, name=None, ttl=None, size=None
+    ) -> pd.DataFrame:
+        """Return dataframe of query through the on-disk cache."""
+        return await self.run(
+            self.cached_query_to_df, query, params, name, ttl, size
+        )
+
+    async def ping_async(self) -> bool:
+        """Ping mssql in the thread pool."""
+        return await self.run(self.ping)
+
+    def close(self) -> None:
+        """Shut down the thread pool."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
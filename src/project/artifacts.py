@@ -0,0 +1,169 @@
+"""Artifacts."""
+
+from __future__ import annotations
+
+from argparse import Namespace
+from hashlib import sha256
+from logging import getLogger
+from os import stat
+from os.path import join
+from threading import Lock
+
+from .configurable import Configurable
+from .constants import MODEL_PATH
+from .lazy import lazy_import
+from .service import unpickle_from_file
+
+logger = getLogger(__name__)
+
+np = lazy_import("numpy")  # pylint: disable=invalid-name
+joblib = lazy_import("joblib")  # pylint: disable=invalid-name; optional
+
+
+def digest(path: str, size: int = 1 << 20) -> str:
+    """Return sha256 hexdigest of file."""
+    result = sha256()
+    with open(path, "rb") as fin:
+        for block in iter(lambda: fin.read(size), b""):
+            result.update(block)
+    return result.hexdigest()
+
+
+def load(path: str, mmap_mode: str = None) -> object:
+    """Return artifact loaded from path.
+
+    .npy files are memory-mapped with mmap_mode, so large arrays are
+        paged in lazily and their pages are shared by every process
+        that maps the same file.
+    .joblib files memory-map the arrays they contain with mmap_mode.
+    Other files are unpickled.
+    """
+    if path.endswith(".npy"):
+        return np.load(path, mmap_mode=mmap_mode, allow_pickle=False)
+    if path.endswith(".joblib"):
+        if joblib is None:
+            raise ImportError("Loading .joblib artifacts requires joblib")
+        return joblib.load(path, mmap_mode=mmap_mode)
+    return unpickle_from_file(path)
+
+
+class Cache:
+    """Cache.
+
+    Process-wide cache of loaded artifacts keyed by path and mmap_mode.
+
+    An artifact is reloaded only when its file changes: the file's
+        mtime and size are checked on each access, and with verify,
+        a changed mtime or size reloads only when the sha256 changed.
+    """
+
+    def __init__(self) -> None:
+        """Initialize cache."""
+        self._lock = Lock()
+        self._entries = {}
+        self.counters = {"hit": 0, "load": 0}
+
+    def __call__(
+        self, path: str, mmap_mode: str = None, verify: bool = False
+    ) -> object:
+        """Return the artifact at path, loading it when it changed."""
+        key = (path, mmap_mode)
+        info = stat(path)
+        stamp = (info.st_mtime_ns, info.st_size)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, cached_stamp, cached_digest = entry
+                if cached_stamp == stamp:
+                    self.counters["hit"] += 1
+                    return value
+                if verify and cached_digest == digest(path):
+                    self._entries[key] = (value, stamp, cached_digest)
+                    self.counters["hit"] += 1
+                    return value
+            value = load(path, mmap_mode)
+            cached_digest = digest(path) if verify else None
+            self._entries[key] = (value, stamp, cached_digest)
+            self.counters["load"] += 1
+        logger.info(
+            '{"artifact.load": {"path": "%s", "mmap_mode": "%s"}}',
+            path,
+            mmap_mode,
+        )
+        return value
+
+    def clear(self) -> None:
+        """Clear cache."""
+        with self._lock:
+            self._entries.clear()
+
+
+CACHE = Cache()
+
+
+class Artifacts(Configurable):
+    """Artifacts.
+
+    Named model artifacts under the model directory, loaded lazily
+        from the process-wide CACHE on each access:
+
+    model:
+      artifacts:
+        path: /tmp/model
+        mmap_mode: r
+        verify: false
+        files:
+          weights: weights.npy
+          pipeline: pipeline.joblib
+          vocabulary: vocabulary.pkl
+
+    weights = self.artifacts["weights"]
+
+    Access artifacts in each run rather than holding on to them,
+        so that a changed file is picked up by the next run.
+    """
+
+    @classmethod
+    def from_cfg(cls, cfg: dict) -> Artifacts:
+        """Return artifacts from cfg."""
+        kwargs = {
+            key: from_cfg(cfg[key])
+            for key, from_cfg in (
+                ("path", str),
+                ("mmap_mode", str),
+                ("verify", bool),
+            )
+            if cfg.get(key) is not None
+        }
+        kwargs["files"] = dict(cfg["files"])
+        return cls(**kwargs)
+
+    @classmethod
+    def patch_args(cls, args: Namespace, cfg: dict) -> dict:
+        """Patch args into cfg."""
+        return cfg
+
+    def __init__(
+        self,
+        files: dict,
+        path: str = MODEL_PATH,
+        mmap_mode: str = "r",
+        verify: bool = False,
+    ) -> None:
+        """Initialize artifacts."""
+        self.files = files
+        self.path = path
+        self.mmap_mode = mmap_mode
+        self.verify = verify
+
+    def __getitem__(self, name: str) -> object:
+        """Return named artifact."""
+        return CACHE(
+            join(self.path, self.files[name]), self.mmap_mode, self.verify
+        )
+
+    def ping(self) -> bool:
+        """Load every artifact."""
+        for name in self.files:
+            self[name]  # pylint: disable=pointless-statement
+        return True
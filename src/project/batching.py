@@ -0,0 +1,248 @@
+"""Batching."""
+
+from __future__ import annotations
+
+from argparse import Namespace
+from sys import getsizeof
+from threading import Lock
+from time import perf_counter
+from typing import Callable, Iterator
+
+from .configurable import Configurable
+from .constants import (
+    BATCH_GROWTH,
+    BATCH_HEADROOM,
+    BATCH_LATENCY,
+    BATCH_MAXIMUM,
+    BATCH_MEMORY,
+    BATCH_MINIMUM,
+    CHUNK_SIZE,
+)
+from .memory import available
+from .telemetry import gauge
+
+
+def width(rows: list, sample: int = 16) -> float:
+    """Return estimated bytes per row of a batch of tuples or documents.
+
+    Sizes are shallow: each row, its keys and values, not the contents
+        of nested values.
+    """
+    if not rows:
+        return 0.0
+    step = max(1, len(rows) // sample)
+    sampled = rows[::step]
+    total = 0
+    for row in sampled:
+        values = row
+        if isinstance(row, dict):
+            values = [*row.keys(), *row.values()]
+        total += getsizeof(row) + sum(getsizeof(each) for each in values)
+    return total / len(sampled)
+
+
+class Adaptive(Configurable):  # pylint: disable=too-many-instance-attributes
+    """Adaptive.
+
+    Batch size of one operation (mssql.read, mongo.read, mongo.write),
+        tuned after each batch toward a target round trip latency
+        without a batch exceeding its memory ceiling.
+
+    The ceiling is the smaller of memory bytes and headroom (a fraction)
+        of what the process may still allocate (see memory.available).
+    Seconds per row and bytes per row are exponentially weighted
+        averages of observed batches. The size shrinks at once and grows
+        at most growth times per batch, within [minimum, maximum].
+    Each new size is recorded as the telemetry gauge batch_size.
+    """
+
+    WEIGHT = 0.5
+
+    @classmethod
+    def from_cfg(cls, cfg: dict) -> Adaptive:
+        """Return adaptive batch size from cfg."""
+        kwargs = {
+            key: from_cfg(cfg[key])
+            for key, from_cfg in (
+                ("name", str),
+                ("initial", int),
+                ("minimum", int),
+                ("maximum", int),
+                ("latency", float),
+                ("memory", int),
+                ("headroom", float),
+                ("growth", float),
+            )
+            if cfg.get(key) is not None
+        }
+        return cls(**kwargs)
+
+    @classmethod
+    def patch_args(cls, args: Namespace, cfg: dict) -> dict:
+        """Patch args into cfg."""
+        return cfg
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        name: str,
+        initial: int = CHUNK_SIZE,
+        minimum: int = BATCH_MINIMUM,
+        maximum: int = BATCH_MAXIMUM,
+        latency: float = BATCH_LATENCY,
+        memory: int = BATCH_MEMORY,
+        headroom: float = BATCH_HEADROOM,
+        growth: float = BATCH_GROWTH,
+    ) -> None:
+        """Initialize adaptive batch size."""
+        self.name = name
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency = latency
+        self.memory = memory
+        self.headroom = headroom
+        self.growth = growth
+        self.seconds = None
+        self.width = None
+        self._size = max(minimum, min(maximum, initial))
+        self._lock = Lock()
+
+    def size(self) -> int:
+        """Return the size of the next batch."""
+        return self._size
+
+    def ceiling(self) -> float:
+        """Return the memory ceiling of a batch in bytes."""
+        free = available()
+        if free is None:
+            return self.memory
+        return min(self.memory, free * self.headroom)
+
+    def observe(self, rows: int, seconds: float, row_width: float) -> int:
+        """Record a batch of rows, return the size of the next batch.
+
+        Seconds is the round trip time of the batch, and row_width the
+            bytes per row (see width).
+        """
+        if rows <= 0:
+            return self._size
+        ceiling = self.ceiling()
+        with self._lock:
+            self.seconds = self._average(self.seconds, seconds / rows)
+            self.width = self._average(self.width, row_width)
+            target = self.maximum
+            if self.seconds > 0:
+                target = min(target, self.latency / self.seconds)
+            if self.width > 0:
+                target = min(target, ceiling / self.width)
+            size = max(
+                self.minimum, min(int(target), int(self._size * self.growth))
+            )
+            changed, self._size = size != self._size, size
+        if changed:
+            gauge("batch_size", self.name, size)
+        return size
+
+    def _average(self, average: float, value: float) -> float:
+        """Return exponentially weighted average of value."""
+        if average is None:
+            return value
+        return self.WEIGHT * value + (1 - self.WEIGHT) * average
+
+
+class Batching(Configurable):
+    """Batching.
+
+    Adaptive batch sizes by operation, shared by every input and output:
+
+    batching:
+      mssql.read:
+        initial: 10000  # rows of the first batch
+        minimum: 100
+        maximum: 1000000
+        latency: 1.0  # target seconds per round trip
+        memory: 268435456  # bytes per batch, at most
+        headroom: 0.1  # of available memory per batch, at most
+        growth: 2.0  # per batch, at most
+      mongo.read: {}
+      mongo.write:
+        latency: 2.0
+
+    Operations without cfg use the defaults.
+    An explicit size (size=, or batch_size in mongo read options)
+        bypasses the controller. Mongo writes stay within the bson
+        bounds of Mongo.batch_size.
+    The process-wide BATCHING is replaced with install.
+    """
+
+    @classmethod
+    def from_cfg(cls, cfg: dict) -> Batching:
+        """Return batching from cfg."""
+        if cfg is None:
+            cfg = {}
+        return cls(
+            {
+                name: Adaptive.from_cfg({**(each or {}), "name": name})
+                for name, each in cfg.items()
+            }
+        )
+
+    @classmethod
+    def patch_args(cls, args: Namespace, cfg: dict) -> dict:
+        """Patch args into cfg."""
+        return cfg
+
+    def __init__(self, controllers: dict = None) -> None:
+        """Initialize batching."""
+        self.controllers = {} if controllers is None else controllers
+        self._lock = Lock()
+
+    def __call__(self, name: str) -> Adaptive:
+        """Return the adaptive batch size of operation name."""
+        controller = self.controllers.get(name)
+        if controller is None:
+            with self._lock:
+                controller = self.controllers.setdefault(name, Adaptive(name))
+        return controller
+
+    def sizes(self) -> dict:
+        """Return the current batch size of each operation."""
+        return {name: each.size() for name, each in self.controllers.items()}
+
+
+BATCHING = Batching()
+
+
+def install(batching: Batching) -> None:
+    """Replace the process-wide BATCHING."""
+    global BATCHING  # pylint: disable=global-statement
+    BATCHING = batching
+
+
+def adaptive(name: str) -> Adaptive:
+    """Return the adaptive batch size of name from the process BATCHING."""
+    return BATCHING(name)
+
+
+def batches(fetch: Callable, name: str, size: int = None) -> Iterator:
+    """Yield batches of fetch(size) until one is empty.
+
+    for rows in batches(cursor.fetchmany, "mssql.read", size):
+        ...
+
+    Without size, each size comes from the adaptive batch size of
+        operation name, which observes each fetch.
+    """
+    controller = adaptive(name) if size is None else None
+    while True:
+        if controller is not None:
+            size = controller.size()
+        start = perf_counter()
+        batch = fetch(size)
+        if not batch:
+            return
+        if controller is not None:
+            controller.observe(
+                len(batch), perf_counter() - start, width(batch)
+            )
+        yield batch
+        del batch  # before the next fetch
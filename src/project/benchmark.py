@@ -0,0 +1,495 @@
+"""Benchmark.
+
+Measure time and peak memory of result materialization, and the
+    throughput, per-stage latency and peak rss of a whole
+    SimpleService run, against synthetic stand-ins, without a database:
+
+    $ project.benchmark --rows 1000000 --output head.json
+    $ git checkout other-branch
+    $ project.benchmark --rows 1000000 --compare head.json
+"""
+
+from __future__ import annotations
+
+from argparse import ArgumentParser
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from gc import collect
+from itertools import islice
+from json import dump, dumps, load
+from platform import python_version
+from subprocess import DEVNULL, CalledProcessError, check_output
+from sys import argv as sys_argv
+from sys import stdout
+from time import perf_counter, sleep
+from tracemalloc import get_traced_memory
+from tracemalloc import start as start_tracing
+from tracemalloc import stop as stop_tracing
+
+# pylint: disable=no-name-in-module
+from pymssql import DATETIME, NUMBER, STRING
+from pymongo import MongoClient
+from pymongo.collection import Collection as MongoCollection
+
+from .constants import CHUNK_SIZE
+from .health import Health
+from .memory import peak_rss, reset_peak_rss
+from .model import Model
+from .mongo import Mongo
+from .mssql import Input
+from .pipeline import Pipeline
+from .service import SimpleService, basic_config
+
+EPOCH = datetime(2020, 1, 1)
+
+
+class Cursor:
+    """Cursor.
+
+    DB-API compatible cursor that generates rows lazily, so the cursor
+        itself holds no result set.
+    Latency seconds are slept on execute and on each fetch round trip.
+    """
+
+    DESCRIPTION = (
+        ("id", NUMBER),
+        ("value", NUMBER),
+        ("name", STRING),
+        ("valid_on", DATETIME),
+    )
+
+    def __init__(self, rows: int, latency: float = 0.0) -> None:
+        """Initialize cursor."""
+        self.rows = rows
+        self.latency = latency
+        self.description = None
+        self._i = 0
+
+    def __enter__(self) -> Cursor:
+        """Enter."""
+        return self
+
+    def __exit__(self, *args) -> None:
+        """Exit."""
+        self.close()
+
+    def close(self) -> None:
+        """Close."""
+        self.description = None
+
+    def execute(self, query, params=None) -> None:
+        """Execute."""  # pylint: disable=unused-argument
+        sleep(self.latency)
+        self.description = tuple(
+            (name, type_code, None, None, None, None, None)
+            for name, type_code in self.DESCRIPTION
+        )
+        self._i = 0
+
+    def fetchall(self) -> list:
+        """Fetch all remaining rows."""
+        return self.fetchmany(self.rows - self._i)
+
+    def fetchmany(self, size: int = 1) -> list:
+        """Fetch at most size rows."""
+        sleep(self.latency)
+        start, end = self._i, min(self._i + size, self.rows)
+        self._i = end
+        return [
+            (i, i * 0.5, "name%d" % (i % 100), EPOCH + timedelta(seconds=i))
+            for i in range(start, end)
+        ]
+
+    def fetchone(self) -> tuple:
+        """Fetch one row or None."""
+        for row in self.fetchmany(1):
+            return row
+        return None
+
+
+@lru_cache(maxsize=None)
+def database():
+    """Return a pymongo database of a client that never connects."""
+    return MongoClient(
+        "mongodb://localhost", connect=False, serverSelectionTimeoutMS=1
+    ).get_database("benchmark")
+
+
+class Collection(MongoCollection):  # pylint: disable=abstract-method
+    """Collection.
+
+    A pymongo Collection that generates documents lazily on find and
+        counts, but does not keep, written documents, without a server.
+    Everything else is pymongo's, for example attribute access returns
+        sub-collections and truth value testing raises, as in a run.
+    Latency seconds are slept on each find and bulk write round trip.
+    """
+
+    def __init__(
+        self, name: str, documents: int = 0, latency: float = 0.0
+    ) -> None:
+        """Initialize collection."""
+        super().__init__(database(), name)
+        self.documents = documents
+        self.latency = latency
+        self.written = 0
+
+    def find(  # pylint: disable=unused-argument,arguments-differ
+        self, query=None, projection=None, **kwargs
+    ):
+        """Return an iterator of documents."""
+        sleep(self.latency)
+        return (
+            {
+                "id": i,
+                "patient": {"id": i % 1000, "age": 20 + i % 70},
+                "valid_on": EPOCH + timedelta(seconds=i),
+            }
+            for i in range(self.documents)
+        )
+
+    def find_one(self, *args, **kwargs):
+        """Return the first document or None."""
+        for document in self.find(*args, **kwargs):
+            return document
+        return None
+
+    def bulk_write(  # pylint: disable=unused-argument,arguments-differ
+        self, ops: list, ordered: bool = True
+    ):
+        """Count ops as inserted documents."""
+        sleep(self.latency)
+        self.written += len(ops)
+        return BulkWriteResult(len(ops))
+
+
+class BulkWriteResult:  # pylint: disable=too-few-public-methods
+    """BulkWriteResult."""
+
+    def __init__(self, inserted: int) -> None:
+        """Initialize bulk write result."""
+        self.inserted_count = inserted
+        self.matched_count = 0
+        self.modified_count = 0
+        self.upserted_count = 0
+
+
+class Stages:
+    """Stages.
+
+    Wall seconds of each call of each named stage.
+    """
+
+    def __init__(self) -> None:
+        """Initialize stages."""
+        self.seconds = {}
+
+    def timed(self, name: str, func, *args, **kwargs):
+        """Return result of func, adding its seconds to stage name."""
+        start = perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.seconds.setdefault(name, []).append(perf_counter() - start)
+
+    def report(self) -> dict:
+        """Return calls, total, mean, and max seconds of each stage."""
+        return {
+            name: {
+                "calls": len(each),
+                "max": round(max(each), 6),
+                "mean": round(sum(each) / len(each), 6),
+                "total": round(sum(each), 6),
+            }
+            for name, each in sorted(self.seconds.items())
+        }
+
+
+class SyntheticInputs:
+    """SyntheticInputs.
+
+    Labs rows from a fake mssql cursor, and patients documents from a
+        fake mongo collection.
+    """
+
+    QUERY = "select id, value, name, valid_on from labs"
+    SCHEMA = {
+        "id": "id",
+        "patient_id": "patient.id",
+        "age": ("patient.age", "int64"),
+    }
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        rows: int,
+        latency: float,
+        size: int,
+        stages: Stages,
+        columnar: bool = False,
+    ) -> None:
+        """Initialize synthetic inputs."""
+        self.rows = rows
+        self.latency = latency
+        self.size = size
+        self.stages = stages
+        self.read = (
+            Input.query_to_columnar_df if columnar else Input.query_to_df
+        )
+        self.patients = Collection("patients", rows, latency)
+
+    def __call__(self) -> tuple:
+        """Return labs and patients dfs."""
+        labs = self.stages.timed(
+            "input.mssql",
+            self.read,
+            Cursor(self.rows, self.latency),
+            self.QUERY,
+            size=self.size,
+        )
+        patients = self.stages.timed(
+            "input.mongo",
+            Mongo.bson_to_df,
+            self.patients.find({}, Mongo.projection(self.SCHEMA)),
+            self.SCHEMA,
+            self.size,
+        )
+        return labs, patients
+
+    def batches(self):
+        """Yield micro-batches of labs and patients dfs."""
+        patients = self.patients.find({}, Mongo.projection(self.SCHEMA))
+        dfs = Input.query_to_dfs(
+            Cursor(self.rows, self.latency), self.QUERY, size=self.size
+        )
+        while True:
+            labs = self.stages.timed("input.mssql", next, dfs, None)
+            if labs is None:
+                return
+            yield labs, self.stages.timed(
+                "input.mongo",
+                Mongo.bson_to_df,
+                islice(patients, len(labs)),
+                self.SCHEMA,
+                self.size,
+            )
+
+    def ping(self) -> bool:
+        """Ping."""
+        return True
+
+
+class SyntheticModel(Model):
+    """SyntheticModel.
+
+    Join labs to patients and score each lab with vectorized arithmetic.
+    """
+
+    def __init__(self, stages: Stages, pipeline: Pipeline = None) -> None:
+        """Initialize synthetic model."""
+        super().__init__(0, 0.0, pipeline=pipeline)
+        self.stages = stages
+
+    def process(self, batch) -> object:
+        """Return predictions df."""
+        batch = self.stages.timed("model.transform", self.transform, batch)
+        return self.stages.timed("model.predict", self.predict, batch)
+
+    def transform(self, batch) -> object:
+        """Return labs joined to patients."""
+        labs, patients = batch
+        return labs.merge(patients, on="id", how="left")
+
+    def predict(self, batch) -> object:
+        """Predict."""
+        df = batch
+        df["score"] = (df["value"] * 0.01 + df["age"] * 0.001).clip(0, 1)
+        return df[["id", "patient_id", "score", "valid_on"]]
+
+
+class SyntheticOutputs:
+    """SyntheticOutputs.
+
+    Write predictions to a fake mongo collection.
+    """
+
+    def __init__(self, latency: float, stages: Stages) -> None:
+        """Initialize synthetic outputs."""
+        self.stages = stages
+        self.predictions = Collection("predictions", latency=latency)
+
+    def __call__(self, df) -> None:
+        """Write predictions."""
+        self.stages.timed("output.mongo", Mongo.write_df, self.predictions, df)
+
+    def ping(self) -> bool:
+        """Ping."""
+        return True
+
+
+def benchmark_service(  # pylint: disable=too-many-arguments
+    rows: int,
+    latency: float = 0.0,
+    size: int = CHUNK_SIZE,
+    repeat: int = 3,
+    pipeline: bool = False,
+    columnar: bool = False,
+) -> dict:
+    """Return throughput, stage latencies, and peak rss of service runs."""
+    stages = Stages()
+    service = SimpleService(
+        SyntheticInputs(rows, latency, size, stages, columnar),
+        SyntheticOutputs(latency, stages),
+        SyntheticModel(stages, Pipeline() if pipeline else None),
+        Health(ttl=float("inf")),
+    )
+    service.ping()
+    runs = []
+    reset = reset_peak_rss()
+    for _ in range(repeat):
+        collect()
+        start = perf_counter()
+        service()
+        runs.append(perf_counter() - start)
+    seconds = min(runs)
+    name = "service" + (".pipeline" if pipeline else "")
+    return {
+        "name": name + (".columnar" if columnar else ""),
+        "peak_rss": peak_rss(),
+        "peak_rss_is_lifetime": not reset,
+        "rows": rows,
+        "rows_per_second": round(rows / seconds, 3),
+        "runs": [round(each, 6) for each in runs],
+        "seconds": round(seconds, 6),
+        "stages": stages.report(),
+    }
+
+
+def commit() -> str:
+    """Return the git commit of the working tree, or None."""
+    try:
+        return (
+            check_output(("git", "rev-parse", "HEAD"), stderr=DEVNULL)
+            .decode("utf-8")
+            .strip()
+        )
+    except (CalledProcessError, OSError):
+        return None
+
+
+def compare(results: list, baseline: dict) -> list:
+    """Return seconds of results relative to baseline results by name."""
+    seconds = {each["name"]: each["seconds"] for each in baseline["results"]}
+    return [
+        {
+            "baseline": seconds[each["name"]],
+            "baseline_commit": baseline.get("commit"),
+            "name": each["name"],
+            "ratio": round(each["seconds"] / seconds[each["name"]], 3)
+            if seconds[each["name"]]
+            else None,
+            "seconds": each["seconds"],
+        }
+        for each in results
+        if each["name"] in seconds
+    ]
+
+
+def measure(func, *args, **kwargs) -> dict:
+    """Return wall seconds and traced peak bytes of func.
+
+    Time and memory are measured in separate calls because tracing
+        slows down allocation heavy code.
+    Warm up before measuring, so that neither includes lazy imports.
+    """
+    collect()
+    start = perf_counter()
+    func(*args, **kwargs)
+    seconds = perf_counter() - start
+    collect()
+    start_tracing()
+    try:
+        func(*args, **kwargs)
+        _, peak = get_traced_memory()
+    finally:
+        stop_tracing()
+    return {"peak_bytes": peak, "seconds": round(seconds, 6)}
+
+
+def benchmark_query_to_df(rows: int, size: int = CHUNK_SIZE) -> list:
+    """Return measurements of the mssql query to dataframe paths."""
+    cursor = Cursor(rows)
+    query = "select id, value, name, valid_on from synthetic"
+    Input.query_to_columnar_df(Cursor(1), query)  # warm up
+    return [
+        {"name": name, "rows": rows, **measure(func, cursor, query, **kwargs)}
+        for name, func, kwargs in (
+            ("query_to_df", Input.query_to_df, {}),
+            ("query_to_df.chunked", Input.query_to_df, {"size": size}),
+            (
+                "query_to_columnar_df",
+                Input.query_to_columnar_df,
+                {"size": size},
+            ),
+        )
+    ]
+
+
+def main(argv=None) -> None:
+    """Main.
+
+    See setup.py entry point.
+    """
+    basic_config()
+    parser = ArgumentParser(description="Benchmark.")
+    parser.add_argument("--rows", default=1000000, type=int)
+    parser.add_argument("--size", default=CHUNK_SIZE, type=int)
+    parser.add_argument(
+        "--latency", default=0.0, type=float, help="Seconds per round trip."
+    )
+    parser.add_argument("--repeat", default=3, type=int)
+    parser.add_argument(
+        "--suite", choices=("all", "query", "service"), default="all"
+    )
+    parser.add_argument("--output", help="Write results to this json file.")
+    parser.add_argument("--compare", help="Compare to this results file.")
+    args = parser.parse_args(sys_argv[1:] if argv is None else argv)
+    results = []
+    if args.suite in ("all", "query"):
+        results.extend(benchmark_query_to_df(args.rows, args.size))
+    if args.suite in ("all", "service"):
+        for pipeline, columnar in (
+            (False, False),
+            (False, True),
+            (True, False),
+        ):
+            results.append(
+                benchmark_service(
+                    args.rows,
+                    args.latency,
+                    args.size,
+                    args.repeat,
+                    pipeline,
+                    columnar,
+                )
+            )
+    for each in results:
+        stdout.write(dumps(each) + "\n")
+    if args.output is not None:
+        with open(args.output, "w") as fout:
+            dump(
+                {
+                    "args": vars(args),
+                    "commit": commit(),
+                    "created_on": datetime.now(timezone.utc).isoformat(),
+                    "python": python_version(),
+                    "results": results,
+                },
+                fout,
+                indent=2,
+                sort_keys=True,
+            )
+    if args.compare is not None:
+        with open(args.compare) as fin:
+            baseline = load(fin)
+        for each in compare(results, baseline):
+            stdout.write(dumps({"compare": each}) + "\n")
@@ -0,0 +1,224 @@
+"""Cache."""
+
+from __future__ import annotations
+
+from argparse import Namespace
+from hashlib import sha256
+from json import dumps
+from logging import getLogger
+from os import makedirs, replace, scandir, stat, unlink, utime
+from os.path import join
+from threading import Lock
+from time import time
+from typing import Callable
+from uuid import uuid4
+
+from .configurable import Configurable
+from .constants import CACHE_MAX_BYTES, CACHE_PATH, CACHE_TTL
+from .lazy import lazy_import
+
+logger = getLogger(__name__)
+
+pa = lazy_import("pyarrow")  # pylint: disable=invalid-name; optional
+
+SUFFIX = ".arrow"
+
+
+class Cache(Configurable):
+    """Cache.
+
+    On-disk cache of input dataframes as Arrow IPC files, keyed by
+        source (server and database), normalized query text and
+        parameters:
+
+    cache:
+      path: /tmp/cache
+      ttl: 900  # seconds, default for every query
+      max_bytes: 1073741824  # least recently used files evicted above
+      ttls:  # seconds, per query name
+        reference_tables: 86400
+
+    df = cache(load, query, params, name="reference_tables", source=uri)
+
+    Files are written atomically and memory-mapped when read back.
+    Entries expire ttl seconds after they were written, eviction uses
+        the access time that each read sets explicitly.
+    Without pyarrow the cache is disabled and every call loads.
+    A df that arrow cannot write (mixed type object columns, duplicate
+        column names) is returned uncached.
+    """
+
+    @classmethod
+    def from_cfg(cls, cfg: dict) -> Cache:
+        """Return cache from cfg."""
+        kwargs = {
+            key: from_cfg(cfg[key])
+            for key, from_cfg in (
+                ("path", str),
+                ("ttl", int),
+                ("max_bytes", int),
+                ("ttls", dict),
+            )
+            if cfg.get(key) is not None
+        }
+        return cls(**kwargs)
+
+    @classmethod
+    def patch_args(cls, args: Namespace, cfg: dict) -> dict:
+        """Patch args into cfg."""
+        return cfg
+
+    @classmethod
+    def key(cls, query: str, params=None, source: str = None) -> str:
+        """Return key for source, query text (whitespace collapsed), params."""
+        text = " ".join(query.split())
+        params = dumps(params, default=repr, sort_keys=True)
+        return sha256(
+            "\0".join((source or "", text, params)).encode("utf-8")
+        ).hexdigest()
+
+    def __init__(
+        self,
+        path: str = CACHE_PATH,
+        ttl: int = CACHE_TTL,
+        max_bytes: int = CACHE_MAX_BYTES,
+        ttls: dict = None,
+    ) -> None:
+        """Initialize cache."""
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.ttls = {} if ttls is None else ttls
+        self.counters = {"evict": 0, "expire": 0, "hit": 0, "miss": 0}
+        self._lock = Lock()
+        if pa is None:
+            logger.warning('{"cache": "disabled, pyarrow is not installed"}')
+        else:
+            makedirs(path, exist_ok=True)
+
+    def __call__(  # pylint: disable=too-many-arguments
+        self,
+        load: Callable,
+        query: str,
+        params=None,
+        name: str = None,
+        ttl: int = None,
+        source: str = None,
+    ):
+        """Return cached df for query and params, or load and cache it."""
+        if pa is None:
+            return load()
+        if ttl is None:
+            ttl = self.ttls.get(name, self.ttl)
+        path = self.file_name(query, params, name, source)
+        df = self.read(path, ttl)
+        if df is not None:
+            return df
+        df = load()
+        try:
+            self.write(path, df)
+        except (pa.ArrowException, OSError, TypeError, ValueError) as e:
+            logger.warning('{"cache.write": %s}', dumps(repr(e)))
+            return df
+        self.evict()
+        return df
+
+    def file_name(
+        self, query: str, params=None, name: str = None, source: str = None
+    ) -> str:
+        """Return the file name of an entry."""
+        key = self.key(query, params, source)
+        if name is not None:
+            key = name + "-" + key
+        return join(self.path, key + SUFFIX)
+
+    def read(self, path: str, ttl: int):
+        """Return memory-mapped df, or None when missing or expired."""
+        now = time()
+        try:
+            with self._lock:
+                mtime = stat(path).st_mtime
+                if now - mtime > ttl:
+                    unlink(path)
+                    self.counters["expire"] += 1
+                    self.counters["miss"] += 1
+                    return None
+                utime(path, (now, mtime))
+                source = pa.memory_map(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.counters["miss"] += 1
+            return None
+        table = pa.ipc.open_file(source).read_all()
+        with self._lock:
+            self.counters["hit"] += 1
+        return table.to_pandas(split_blocks=True)
+
+    def write(self, path: str, df) -> None:
+        """Write df atomically."""
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        temporary = path + "." + uuid4().hex
+        try:
+            with pa.OSFile(temporary, "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            replace(temporary, path)
+        except BaseException:
+            try:
+                unlink(temporary)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def evict(self) -> None:
+        """Remove least recently used entries above max_bytes."""
+        with self._lock:
+            entries = [
+                (each.stat().st_atime, each.stat().st_size, each.path)
+                for each in scandir(self.path)
+                if each.name.endswith(SUFFIX)
+            ]
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    unlink(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                self.counters["evict"] += 1
+
+    def invalidate(
+        self,
+        query: str = None,
+        params=None,
+        name: str = None,
+        source: str = None,
+    ) -> None:
+        """Invalidate entries.
+
+        Remove the entry for source, query and params, else every entry
+            of name, else every entry.
+        """
+        with self._lock:
+            if query is not None:
+                paths = [self.file_name(query, params, name, source)]
+            else:
+                prefix = "" if name is None else name + "-"
+                paths = [
+                    each.path
+                    for each in scandir(self.path)
+                    if each.name.startswith(prefix)
+                    and each.name.endswith(SUFFIX)
+                ]
+            for path in paths:
+                try:
+                    unlink(path)
+                except FileNotFoundError:
+                    pass
+        logger.info(
+            '{"cache.invalidate": {"name": "%s", "count": %d}}',
+            name,
+            len(paths),
+        )
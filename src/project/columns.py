@@ -0,0 +1,206 @@
+"""Columns."""
+
+from __future__ import annotations
+
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Sequence
+
+import numpy as np
+from pandas import DataFrame, isna, to_datetime
+
+BOOL = np.dtype("bool")
+DATETIME = np.dtype("datetime64[ns]")
+FLOAT = np.dtype("float64")
+INT = np.dtype("int64")
+OBJECT = np.dtype("object")
+
+# dtypes that hold nulls, and their promotion when values do not fit
+NULLABLE = {DATETIME, FLOAT, OBJECT}
+PROMOTIONS = {BOOL: OBJECT, DATETIME: OBJECT, FLOAT: OBJECT, INT: FLOAT}
+
+# dtype of the first non-null value by type, in order: bool is an int
+INFERENCES = (
+    ((bool, np.bool_), BOOL),
+    ((int, np.integer), INT),
+    ((float, Decimal, np.floating), FLOAT),
+    ((datetime, date), DATETIME),
+)
+
+
+class Column:
+    """Column.
+
+    Growable, typed numpy buffer filled one chunk of values at a time.
+
+    Use typed buffers for numeric and datetime values instead of
+        object arrays of python values:
+
+    columns = [Column(name) for name in names]
+    for rows in chunks:
+        for column, values in zip(columns, zip(*rows)):
+            column.extend(values)
+    df = Column.to_df(columns)
+
+    When dtype is None, it is inferred from the first non-null value.
+    When values do not fit the dtype, the column is promoted:
+        int64 -> float64 -> object, bool -> object, datetime64 -> object.
+    Tz-aware datetimes are stored as utc and localized in to_df, also
+        in a column created with the datetime64[ns] dtype; aware values
+        after naive ones promote the column to object.
+    """
+
+    @classmethod
+    def to_df(cls, columns: Sequence[Column]) -> DataFrame:
+        """Return dataframe of columns without copying the buffers."""
+        df = DataFrame(
+            {i: each.values() for i, each in enumerate(columns)}, copy=False
+        )
+        for i, each in enumerate(columns):
+            if each.tz is not None and each.dtype == DATETIME:
+                df[i] = df[i].dt.tz_localize(each.tz)
+        df.columns = [each.name for each in columns]
+        return df
+
+    @classmethod
+    def infer(cls, value) -> tuple:
+        """Return (dtype, tz) for a non-null value."""
+        for types, dtype in INFERENCES:
+            if isinstance(value, types):
+                return dtype, cls.tz_of(value)
+        return OBJECT, None
+
+    @classmethod
+    def tz_of(cls, value) -> object:
+        """Return utc for a tz-aware datetime value, otherwise None."""
+        if getattr(value, "tzinfo", None) is not None:
+            return timezone.utc
+        return None
+
+    def __init__(self, name: str, dtype=None) -> None:
+        """Initialize column."""
+        self.name = name
+        self.dtype = None if dtype is None else np.dtype(dtype)
+        self.tz = None
+        self.size = 0
+        self._buffer = None
+        self._nulls = 0
+        self._naive = False
+
+    def extend(self, values: Sequence) -> None:
+        """Append values."""
+        if not values:
+            return
+        if self.dtype is None:
+            for value in values:
+                if value is not None:
+                    self.dtype, self.tz = self.infer(value)
+                    break
+            else:
+                self._nulls += len(values)
+                return
+        if self._buffer is None:
+            self._allocate(len(values))
+        while True:
+            try:
+                array = self._convert(values)
+                break
+            except (AttributeError, OverflowError, TypeError, ValueError):
+                self._promote(PROMOTIONS[self.dtype])
+        self._reserve(len(array))
+        start, end = self.size, self.size + len(array)
+        self._buffer[start:end] = array
+        self.size = end
+
+    def values(self) -> np.ndarray:
+        """Return the filled buffer, releasing unused capacity."""
+        if self._buffer is None:
+            self._allocate(0)
+        if len(self._buffer) != self.size:
+            self._buffer.resize(self.size, refcheck=False)
+        return self._buffer
+
+    def _allocate(self, capacity: int) -> None:
+        """Allocate the buffer, filling leading nulls."""
+        if self.dtype is None:
+            self.dtype = OBJECT
+        if self._nulls and self.dtype not in NULLABLE:
+            self.dtype = PROMOTIONS[self.dtype]
+        self._buffer = np.empty(self._nulls + capacity, dtype=self.dtype)
+        if self._nulls:
+            self._buffer[: self._nulls] = None
+        self.size = self._nulls
+
+    def _convert(self, values: Sequence) -> np.ndarray:
+        """Return values as an array of dtype, raise when they do not fit."""
+        if self.dtype == OBJECT:
+            return self._convert_object(values)
+        if self.dtype == DATETIME:
+            array = self._convert_datetimes(values)
+        elif self.dtype in NULLABLE:
+            array = np.array(values, dtype=self.dtype)
+        else:
+            # numpy silently casts None to False and truncates floats
+            array = np.array(values)
+            if array.dtype != self.dtype:
+                raise TypeError(array.dtype)
+        if array.shape != (len(values),):  # nested sequences
+            raise ValueError(array.shape)
+        return array
+
+    def _convert_datetimes(self, values: Sequence) -> np.ndarray:
+        """Return values as a datetime64[ns] array, utc when tz-aware.
+
+        The first non-null value sets whether the column is tz-aware.
+        """
+        if self.tz is None:
+            first = next((each for each in values if not isna(each)), None)
+            if self.tz_of(first) is not None:
+                if self._naive:
+                    raise TypeError("tz-aware after naive datetimes")
+                self.tz = timezone.utc
+            elif first is not None:
+                self._naive = True
+        # to_datetime converts in c, numpy converts value by value
+        index = to_datetime(values, utc=self.tz is not None)
+        if self.tz is not None:
+            index = index.tz_convert(None)
+        return index.to_numpy(dtype=DATETIME)
+
+    @classmethod
+    def _convert_object(cls, values: Sequence) -> np.ndarray:
+        """Return values as a 1d object array, even nested sequences."""
+        try:
+            array = np.array(values, dtype=OBJECT)
+            if array.shape == (len(values),):
+                return array
+        except ValueError:
+            pass
+        array = np.empty(len(values), dtype=OBJECT)
+        for i, value in enumerate(values):
+            array[i] = value
+        return array
+
+    def _promote(self, dtype: np.dtype) -> None:
+        """Promote the column and its buffer to dtype."""
+        buffer = self._buffer
+        if self.dtype == DATETIME and dtype == OBJECT:
+            # datetime64[ns] casts to int, datetime64[us] to datetime
+            buffer = buffer.astype("datetime64[us]")
+            if self.tz is not None:
+                buffer = buffer.astype(OBJECT)
+                for i in range(self.size):
+                    if buffer[i] is not None:
+                        buffer[i] = buffer[i].replace(tzinfo=self.tz)
+        self._buffer = buffer.astype(dtype)
+        self.dtype = dtype
+
+    def _reserve(self, count: int) -> None:
+        """Grow the buffer geometrically to fit count more values."""
+        needed = self.size + count
+        capacity = len(self._buffer)
+        if needed <= capacity:
+            return
+        buffer = np.empty(max(needed, capacity * 2), dtype=self.dtype)
+        buffer[: self.size] = self._buffer[: self.size]
+        self._buffer = buffer
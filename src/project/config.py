@@ -0,0 +1,107 @@
+"""Config."""
+
+from __future__ import annotations
+
+from hashlib import sha256
+from json import dumps
+from logging import getLogger
+from os import getuid, makedirs, replace, stat
+from os.path import join
+from pickle import HIGHEST_PROTOCOL, dump, load as unpickle
+from typing import Callable
+from uuid import uuid4
+
+from yaml import load as yaml_load
+
+from .constants import CONFIG_CACHE_PATH
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:  # pragma: no cover; libyaml is optional
+    from yaml import SafeLoader
+
+try:
+    from .version import version as VERSION
+except ImportError:  # pragma: no cover; written by setuptools_scm on build
+    VERSION = "unknown"
+
+logger = getLogger(__name__)
+
+
+def load(
+    file_name: str,
+    validate: Callable = None,
+    path: str = CONFIG_CACHE_PATH,
+) -> object:
+    """Return yaml file_name, compiled once per file content.
+
+    The yaml is parsed with the libyaml (C) loader when available and
+        validated (validate raises on invalid cfg) only on a cache miss.
+    The result is cached as a pickle keyed by the sha256 of the file,
+        the package version and the validator (see validation_key), so
+        later starts with the same file and code, for example
+        project.ping, only unpickle.
+    A corrupt cache file is parsed again and replaced.
+    The cache directory is private to the user (0700); set path to None
+        to disable caching.
+    Callers own the returned object; it is not shared across calls.
+    """
+    with open(file_name, "rb") as fin:
+        content = fin.read()
+    if path is None:
+        return compile_yaml(content, validate)
+    salt = "\0".join((VERSION, validation_key(validate))).encode("utf-8")
+    key = sha256(content + b"\0" + salt).hexdigest()
+    cached = join(path, key + ".pickle")
+    try:
+        makedirs(path, mode=0o700, exist_ok=True)
+        if stat(path).st_uid != getuid():
+            raise PermissionError("%s is not owned by this user" % path)
+    except OSError as e:
+        logger.warning('{"config.cache": "%s"}', e)
+        return compile_yaml(content, validate)
+    try:
+        with open(cached, "rb") as fin:
+            return unpickle(fin)
+    except FileNotFoundError:
+        pass
+    except Exception as e:  # pylint: disable=broad-except; corrupt cache
+        logger.warning('{"config.cache": %s}', dumps(repr(e)))
+    cfg = compile_yaml(content, validate)
+    try:
+        temporary = cached + "." + uuid4().hex
+        with open(temporary, "wb") as fout:
+            dump(cfg, fout, protocol=HIGHEST_PROTOCOL)
+        replace(temporary, cached)
+    except OSError as e:
+        logger.warning('{"config.cache": "%s"}', e)
+    return cfg
+
+
+def validation_key(validate: Callable = None) -> str:
+    """Return what a cached cfg depends on in validate.
+
+    The qualified name of validate and, for a classmethod such as
+        Service.validate, the class and its REQUIRED keys, so subclasses
+        with different requirements do not share entries.
+    """
+    if validate is None:
+        return "none"
+    owner = getattr(validate, "__self__", None)
+    return repr(
+        (
+            getattr(validate, "__module__", None),
+            getattr(validate, "__qualname__", None),
+            getattr(owner, "__module__", None),
+            getattr(owner, "__qualname__", None),
+            getattr(owner, "REQUIRED", None),
+        )
+    )
+
+
+def compile_yaml(content: bytes, validate: Callable = None) -> object:
+    """Return parsed and validated yaml content."""
+    cfg = yaml_load(content, Loader=SafeLoader)
+    if validate is not None:
+        validate(cfg)
+    return cfg
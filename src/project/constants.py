@@ -5,3 +5,38 @@ BACKOFF = 0.15
 ENCODING = "utf-8"
 RETRIES = 5
 TZ_AWARE = True
+CHUNK_SIZE = 10000
+MONGO_POOL = {
+    "connect": CONNECT,
+    "max_idle_time_ms": None,
+    "max_pool_size": 100,
+    "min_pool_size": 0,
+}
+MSSQL_POOL_IDLE = 30
+MSSQL_POOL_LIFETIME = 1800
+MSSQL_POOL_SIZE = 4
+MSSQL_POOL_TIMEOUT = 60
+BSON_BATCH_BYTES = 16777216
+BSON_BATCH_OPS = 100000
+BSON_SAMPLE = 100
+SCHEDULE_HISTORY = 100
+MODEL_PATH = "/tmp/model"
+PIPELINE_POLL = 0.1
+PIPELINE_QUEUE_SIZE = 2
+CACHE_MAX_BYTES = 1073741824
+CACHE_PATH = "/tmp/cache"
+CACHE_TTL = 900
+BACKOFF_CAP = 5.0
+RETRY_BUDGET = 30.0
+BREAKER_RESET = 10.0
+BREAKER_THRESHOLD = 20
+HEALTH_TIMEOUT = 60.0
+HEALTH_TTL = 0.0
+CONFIG_CACHE_PATH = "/tmp/cfg"
+BATCH_GROWTH = 2.0
+BATCH_HEADROOM = 0.1
+BATCH_LATENCY = 1.0
+BATCH_MAXIMUM = 1000000
+BATCH_MEMORY = 268435456
+BATCH_MINIMUM = 100
+KEYS_CHUNK = 1000
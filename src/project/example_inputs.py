@@ -3,10 +3,12 @@
 from __future__ import annotations
 
 from argparse import Namespace
+from asyncio import gather, run
 
 from .configurable import Configurable
 from .example_mongo_input import Input as MongoInput
 from .example_mssql_input import Input as MssqlInput
+from .watermark import Watermarks
 
 
 class InputBatch:  # pylint: disable=too-few-public-methods
@@ -25,18 +27,27 @@ class Inputs(Configurable):
 
     """
 
-    ARGS = {**MongoInput.ARGS, **MssqlInput.ARGS}
+    ARGS = {**MongoInput.ARGS, **MssqlInput.ARGS, **Watermarks.ARGS}
 
     @classmethod
     def from_cfg(cls, cfg: dict) -> Inputs:
-        """Return instance from cfg."""
+        """Return instance from cfg.
+
+        Watermarks are optional: without a watermarks uri (or
+            OUTPUT_URI), every run reads its whole lookback window.
+        """
         kwargs = {
-            from_cfg(cfg[key])
+            key: from_cfg(cfg[key])
             for key, from_cfg in (
                 ("mongo", MongoInput.from_cfg),
                 ("mssql", MssqlInput.from_cfg),
             )
         }
+        watermarks = cfg.get("watermarks") or {}
+        if watermarks.get("uri") is not None:
+            kwargs["watermarks"] = Watermarks.from_cfg(watermarks)
+        elif watermarks.get("replay") is not None:
+            raise ValueError("Replay requires a watermarks uri")
         return cls(**kwargs)
 
     @classmethod
@@ -47,11 +58,12 @@ class Inputs(Configurable):
         for key, patch_args in (
             ("mongo", MongoInput.patch_args),
             ("mssql", MssqlInput.patch_args),
+            ("watermarks", Watermarks.patch_args),
         ):
             cfg[key] = patch_args(args, cfg.get(key))
         return cfg
 
-    def __init__(self):
+    def __init__(self, mongo, mssql, watermarks: Watermarks = None):
         """Init.
         Add configurable parameters used across all inputs to the this.
         For example, the length of a lookback window might be shared
@@ -62,7 +74,34 @@ class Inputs(Configurable):
         For example a configurable mapping of names to features might be
             specific to an input.
         """
-        raise NotImplementedError()
+        self.mongo = mongo
+        self.mssql = mssql
+        self.watermarks = watermarks
+        self.pending = {}
+
+    def interval(self, name: str, to_value) -> tuple:
+        """Return (from_value, to_value] to read for input name.
+
+        From_value is None without watermarks or on the first run (apply
+            the lookback window instead).
+        To_value is committed by commit once the run's outputs are
+            written.
+        """
+        if self.watermarks is None:
+            return None, to_value
+        self.pending[name] = to_value
+        return self.watermarks.interval(name, to_value)
+
+    def commit(self, values: dict = None) -> None:
+        """Commit watermarks of the run, by default those read by interval.
+
+        The service calls commit after the run's outputs are written.
+        """
+        if values is None:
+            values = self.pending
+        if self.watermarks is not None and values:
+            self.watermarks.commit(values)
+        self.pending = {}
 
     def __call__(self):
         """__call__.
@@ -81,5 +120,52 @@ class Inputs(Configurable):
             method of the input.
         For example the computed valid_on..valid_end for specific types of
             evidence of an input.
+
+        Read only new rows with watermarks; the service commits the
+            upper bounds after the outputs are written:
+
+        from_id, to_id = self.interval("mssql", max_id)
+        df = self.mssql(from_id, to_id)
+
+        In a sharded run (see Shards), read only the cohort of the
+            worker's shard:
+
+        shard = current()
+        if shard is not None:
+            cohort = shard.filter(cohort)
+
+        With async inputs (AsyncMongo, AsyncInput), fetch every input
+            concurrently instead of one after another:
+
+        labs, patients = self.gather(
+            self.mssql.get_labs(from_id, to_id),
+            self.mongo.get_patients(),
+        )
+        """
+        raise NotImplementedError()
+
+    @classmethod
+    def gather(cls, *awaitables) -> list:
+        """Return results of awaitables run concurrently, in order.
+
+        The first exception is raised once every awaitable is done.
+        """
+
+        async def gathered():
+            results = await gather(*awaitables, return_exceptions=True)
+            for each in results:
+                if isinstance(each, BaseException):
+                    raise each
+            return results
+
+        return run(gathered())
+
+    def batches(self):
+        """Batches.
+
+        Implement batches to run the model as a pipeline (see Pipeline):
+            yield micro-batches of the cohort, each like the batch
+            returned by __call__, for example by reading the cohort
+            first and then the features for a slice of it at a time.
         """
         raise NotImplementedError()
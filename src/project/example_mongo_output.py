@@ -3,16 +3,10 @@
 from __future__ import annotations
 
 from argparse import Namespace
-from logging import INFO, basicConfig, getLogger
-from sys import stdout
+from logging import getLogger
 
 from .mongo import Mongo as BaseOutput  # retry_on_reconnect,
 
-basicConfig(
-    level=INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    stream=stdout,
-)
 logger = getLogger(__name__)
 
 
@@ -46,13 +40,16 @@ class Output(BaseOutput):
         Accept whatever additional arguments you need.
 
         Wrap unit of work methods with retry_on_reconnect decorator.
+        Prefer write_df for dataframes, it batches and retries each
+            bulk write on its own.
+        Input watermarks are committed by the service after this returns.
         """
         # transform = batch.transform
         # evidence = batch.evidence
         # with self.collections() as collections:
         #    self.write_evidence(collections.evidence, evidence_batch)
         #    self.write_transform(collections.evidence, transform_batch)
-        #    self.write_prediction(collections.prediction, prediction_batch)
+        #    self.write_df(collections.prediction, df, keys=("id",))
         raise NotImplementedError()
 
     def ping(self) -> bool:
@@ -65,7 +62,3 @@ class Output(BaseOutput):
             but not data for features, or cohort.
         """
         raise NotImplementedError()
-
-    # @retry_on_reconnect()
-    # def write_prediction(self, collection, df) -> None:
-    #     collection.insert_many(df)
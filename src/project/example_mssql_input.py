@@ -4,8 +4,7 @@ from __future__ import annotations
 
 from argparse import Namespace
 
-from yaml import safe_load as yaml_loads
-
+from .config import load as load_cfg
 from .mssql import Input as BaseInput, retry_on_operational_error
 
 
@@ -29,21 +28,32 @@ class Input(BaseInput):
             "help": "Yaml configuration file of tables.",
             "type": str,
         },
+        ("INPUT_QUERIES", "--input-queries"): {
+            "dest": "input_queries",
+            "help": "Directory of .sql query files.",
+            "type": str,
+        },
     }
 
     @classmethod
     def patch_args(cls, args: Namespace, cfg: dict) -> None:
         """Patch args into cfg."""
-        for key, value in (("uri", args.input_uri),):
+        for key, value in (
+            ("uri", args.input_uri),
+            ("queries", args.input_queries),
+        ):
             if value is not None:
                 cfg[key] = value
 
         for key, value in (("tables", args.input_tables),):
             if value is not None:
-                with open(value) as fin:
-                    cfg[key] = yaml_loads(fin.read())
+                cfg[key] = load_cfg(value)
         return cfg
 
     @retry_on_operational_error()
-    def __call__(self):
+    def __call__(self, from_id=None, to_id=None):
+        """Return input df for the interval (from_id, to_id].
+
+        See Watermarks for incremental reads and replay.
+        """
         raise NotImplementedError()
@@ -0,0 +1,132 @@
+"""Health."""
+
+from __future__ import annotations
+
+from argparse import Namespace
+from json import dumps
+from logging import getLogger
+from threading import Thread
+from time import monotonic
+from typing import Callable
+
+from .configurable import Configurable
+from .constants import HEALTH_TIMEOUT, HEALTH_TTL
+
+logger = getLogger(__name__)
+
+
+class Unhealthy(Exception):
+    """A dependency failed, returned False, or timed out on ping."""
+
+    def __init__(self, report: dict) -> None:
+        """Initialize unhealthy with the health report."""
+        super().__init__(dumps(report))
+        self.report = report
+
+
+class Health(Configurable):
+    """Health.
+
+    Ping dependencies concurrently, each within timeout seconds:
+
+    health:
+      timeout: 60  # seconds for each dependency
+      ttl: 300  # seconds a healthy result skips the ping before a run
+
+    report = health({"model": model.ping, "inputs": inputs.ping})
+    {"inputs": {"ok": true, "seconds": 0.2}, "model": {...}, "ok": true}
+
+    Raise Unhealthy with the report when any ping raises, returns
+        False, or times out; the first exception is its cause.
+    Pings borrow from the same process-wide pools as runs (CLIENTS,
+        Uri.pool), so the first run reuses the connections ping opened.
+    Each ping runs in a daemon thread, so a hung dependency neither
+        delays the report past timeout nor keeps the process from
+        exiting.
+    With ttl > 0, a long-lived process (see Scheduler) skips the ping
+        before runs while the last healthy report is fresh.
+    """
+
+    @classmethod
+    def from_cfg(cls, cfg: dict) -> Health:
+        """Return health from cfg."""
+        if cfg is None:
+            cfg = {}
+        kwargs = {
+            key: from_cfg(cfg[key])
+            for key, from_cfg in (("timeout", float), ("ttl", float))
+            if cfg.get(key) is not None
+        }
+        return cls(**kwargs)
+
+    @classmethod
+    def patch_args(cls, args: Namespace, cfg: dict) -> dict:
+        """Patch args into cfg."""
+        return cfg
+
+    def __init__(
+        self, timeout: float = HEALTH_TIMEOUT, ttl: float = HEALTH_TTL
+    ) -> None:
+        """Initialize health."""
+        self.timeout = timeout
+        self.ttl = ttl
+        self.checked = None
+        self.last = None
+
+    def __call__(self, pings: dict) -> dict:
+        """Return report of pings run concurrently."""
+        start = monotonic()
+        started = {
+            name: self.start(name, ping) for name, ping in pings.items()
+        }
+        report, cause = {}, None
+        for name, (thread, outcome) in started.items():
+            thread.join(max(0.0, start + self.timeout - monotonic()))
+            if thread.is_alive():
+                report[name] = {"error": "timeout", "ok": False}
+            elif "error" in outcome:
+                error = outcome["error"]
+                report[name] = {"error": repr(error), "ok": False}
+                if cause is None:
+                    cause = error
+            else:
+                result, seconds = outcome["result"]
+                report[name] = {"ok": result is not False, "seconds": seconds}
+        report["ok"] = all(each["ok"] for each in report.values())
+        logger.info('{"health": %s}', dumps(report))
+        if not report["ok"]:
+            self.checked, self.last = None, None
+            raise Unhealthy(report) from cause
+        self.checked, self.last = monotonic(), report
+        return report
+
+    @classmethod
+    def start(cls, name: str, ping: Callable) -> tuple:
+        """Return a started daemon thread of ping and its outcome dict.
+
+        Outcome gets "result", (result, seconds), or "error".
+        """
+        outcome = {}
+
+        def run():
+            try:
+                outcome["result"] = cls.timed(ping)
+            except Exception as e:  # pylint: disable=broad-except
+                outcome["error"] = e
+
+        thread = Thread(target=run, name="ping." + name, daemon=True)
+        thread.start()
+        return thread, outcome
+
+    @classmethod
+    def timed(cls, ping: Callable) -> tuple:
+        """Return result and seconds of ping."""
+        start = monotonic()
+        result = ping()
+        return result, round(monotonic() - start, 6)
+
+    def fresh(self) -> bool:
+        """Return True when the last healthy report is within ttl."""
+        return (
+            self.checked is not None and monotonic() - self.checked < self.ttl
+        )
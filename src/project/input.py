@@ -3,18 +3,11 @@
 from __future__ import annotations
 
 from argparse import Namespace
-from logging import INFO, basicConfig, getLogger
-from sys import stdout
-
-from yaml import safe_load as yaml_loads
+from logging import getLogger
 
+from .config import load as load_cfg
 from .mssql import Input as BaseMssqlInput  # retry_on_operational_error,
 
-basicConfig(
-    level=INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    stream=stdout,
-)
 logger = getLogger(__name__)
 
 
@@ -32,19 +25,26 @@ class Input(BaseMssqlInput):
             "help": "Yaml configuration file of tables.",
             "type": str,
         },
+        ("INPUT_QUERIES", "--input-queries"): {
+            "dest": "input_queries",
+            "help": "Directory of .sql query files.",
+            "type": str,
+        },
     }
 
     @classmethod
     def patch_args(cls, args: Namespace, cfg: dict) -> None:
         """Patch args into cfg."""
-        for key, value in (("uri", args.input_uri),):
+        for key, value in (
+            ("uri", args.input_uri),
+            ("queries", args.input_queries),
+        ):
             if value is not None:
                 cfg[key] = value
 
         for key, value in (("tables", args.input_tables),):
             if value is not None:
-                with open(value) as fin:
-                    cfg[key] = yaml_loads(fin.read())
+                cfg[key] = load_cfg(value)
 
     def __call__(self) -> tuple:
         """Return a tuple of input dfs.
@@ -0,0 +1,52 @@
+"""Lazy."""
+
+from __future__ import annotations
+
+from importlib import import_module
+from importlib.util import find_spec
+from sys import modules
+from threading import RLock
+from types import ModuleType
+
+_LOCK = RLock()
+
+
+class LazyModule(ModuleType):  # pylint: disable=too-few-public-methods
+    """LazyModule.
+
+    Stand-in for a module, imported on first attribute access.
+
+    importlib.util.LazyLoader is not thread-safe before python 3.12: a
+        thread can see the module half executed while another thread
+        runs it, so the import is serialized here. Once imported, the
+        module's attributes are copied onto the stand-in.
+    It has no public methods: every attribute is the module's.
+    """
+
+    def __getattr__(self, attr: str):
+        """Return attr of the module, importing it on first use."""
+        with _LOCK:
+            module = import_module(self.__name__)
+            self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+
+def lazy_import(name: str) -> ModuleType:
+    """Return module name, executed on first attribute access.
+
+    Return None when the module is not installed, for optional
+        dependencies:
+
+    pa = lazy_import("pyarrow")
+    if pa is None:
+        ...
+
+    Heavy backends (pandas, pyarrow, numpy) are then only loaded by
+        services, and ping jobs, that use them.
+    """
+    module = modules.get(name)
+    if module is not None:
+        return module
+    if find_spec(name) is None:
+        return None
+    return LazyModule(name)
@@ -0,0 +1,195 @@
+"""Memory.
+
+The rss helpers are Linux only: they read /proc and /sys/fs/cgroup, and
+    this module imports resource and os.sysconf, which Windows lacks.
+Elsewhere rss falls back to peak_rss, and peak_rss to getrusage, whose
+    ru_maxrss is in kB on Linux but in bytes on macOS.
+"""
+
+from __future__ import annotations
+
+import gc
+from argparse import Namespace
+from contextlib import contextmanager
+from ctypes import CDLL
+from ctypes.util import find_library
+from json import dumps
+from logging import getLogger
+from os import sysconf
+from resource import RUSAGE_SELF, getrusage
+
+from .configurable import Configurable
+
+logger = getLogger(__name__)
+
+PAGE_SIZE = sysconf("SC_PAGE_SIZE")
+
+
+def rss() -> int:
+    """Return resident set size in bytes."""
+    try:
+        with open("/proc/self/statm") as fin:
+            return int(fin.read().split()[1]) * PAGE_SIZE
+    except OSError:
+        return peak_rss()
+
+
+def peak_rss() -> int:
+    """Return peak resident set size in bytes since the last reset."""
+    try:
+        with open("/proc/self/status") as fin:
+            for line in fin:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return getrusage(RUSAGE_SELF).ru_maxrss * 1024  # kB on linux
+
+
+def available() -> int:
+    """Return bytes this process may still allocate, None when unknown.
+
+    The cgroup (v2, then v1) limit less its usage inside a container,
+        otherwise MemAvailable of the host.
+    """
+    for limit, usage in (
+        ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory.current"),
+        (
+            "/sys/fs/cgroup/memory/memory.limit_in_bytes",
+            "/sys/fs/cgroup/memory/memory.usage_in_bytes",
+        ),
+    ):
+        try:
+            with open(limit) as fin:
+                value = fin.read().strip()
+            with open(usage) as fin:
+                used = int(fin.read())
+        except (OSError, ValueError):
+            continue
+        if value != "max" and int(value) < 1 << 62:  # v1 unlimited
+            return max(0, int(value) - used)
+    try:
+        with open("/proc/meminfo") as fin:
+            for line in fin:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak_rss() -> bool:
+    """Reset peak resident set size, return False when unsupported."""
+    try:
+        with open("/proc/self/clear_refs", "w") as fout:
+            fout.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def trim() -> bool:
+    """Release free heap memory to the os, return False when unsupported.
+
+    malloc_trim is glibc only, musl (alpine) does not provide it.
+    """
+    try:
+        libc = CDLL(find_library("c"))
+        return bool(libc.malloc_trim(0))
+    except (AttributeError, OSError, TypeError):
+        return False
+
+
+class Memory(Configurable):
+    """Memory.
+
+    Memory management policy around each model run:
+
+    model:
+      memory:
+        thresholds: [700, 10, 10]  # gc.set_threshold, applied on init
+        freeze: true  # gc.freeze startup objects before the first run
+        collect: true  # gc.collect after each run
+        rss_threshold: 536870912  # bytes, collect only above this rss
+        trim: true  # release freed heap to the os after collect
+
+    Each run logs its peak and retained (after - before) rss, to size
+        Nomad resources.memory from data.
+    Without configuration a full collection follows every run.
+    """
+
+    @classmethod
+    def from_cfg(cls, cfg: dict) -> Memory:
+        """Return memory policy from cfg."""
+        if cfg is None:
+            cfg = {}
+        kwargs = {
+            key: from_cfg(cfg[key])
+            for key, from_cfg in (
+                ("thresholds", tuple),
+                ("freeze", bool),
+                ("collect", bool),
+                ("rss_threshold", int),
+                ("trim", bool),
+            )
+            if cfg.get(key) is not None
+        }
+        return cls(**kwargs)
+
+    @classmethod
+    def patch_args(cls, args: Namespace, cfg: dict) -> dict:
+        """Patch args into cfg."""
+        return cfg
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        thresholds: tuple = None,
+        freeze: bool = False,
+        collect: bool = True,
+        rss_threshold: int = None,
+        trim: bool = False,  # pylint: disable=redefined-outer-name
+    ) -> None:
+        """Initialize memory policy."""
+        if thresholds is not None:
+            gc.set_threshold(*thresholds)
+        self.freeze = freeze
+        self.collect = collect
+        self.rss_threshold = rss_threshold
+        self.trim = trim
+        self.frozen = False
+        self.last = None
+
+    @contextmanager
+    def __call__(self):
+        """Apply the policy around a run."""
+        if self.freeze and not self.frozen:
+            gc.collect()
+            gc.freeze()
+            self.frozen = True
+        reset = reset_peak_rss()
+        before = rss()
+        try:
+            yield
+        finally:
+            self.last = self.after_run(before, reset)
+            logger.info('{"memory": %s}', dumps(self.last))
+
+    def after_run(self, before: int, reset: bool) -> dict:
+        """Collect and trim per policy, return the run's memory report."""
+        peak = peak_rss()
+        collected = None
+        if self.collect and (
+            self.rss_threshold is None or rss() > self.rss_threshold
+        ):
+            collected = gc.collect()
+            if self.trim:
+                trim()
+        after = rss()
+        return {
+            "after": after,
+            "before": before,
+            "collected": collected,
+            "peak": peak,
+            "peak_is_lifetime": not reset,
+            "retained": after - before,
+        }
@@ -7,21 +7,16 @@ Alter this model instance to
 from __future__ import annotations
 
 from argparse import Namespace
-from logging import INFO, basicConfig, getLogger
-from sys import stdout
+from functools import partial
+from logging import getLogger
 
+from .artifacts import Artifacts
 from .configurable import Configurable
 from .example_inputs import InputBatch
-from .service import (
-    # unpickle_from_file,
-    garbage_collection,
-)
-
-basicConfig(
-    level=INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    stream=stdout,
-)
+from .memory import Memory
+from .pipeline import Pipeline
+from .telemetry import span, timed, timed_iter
+
 logger = getLogger(__name__)
 
 
@@ -54,6 +49,11 @@ class Model(Configurable):
                 ("second_model_configurable_property", float),
             )
         }
+        if cfg.get("artifacts") is not None:
+            kwargs["artifacts"] = Artifacts.from_cfg(cfg["artifacts"])
+        kwargs["memory"] = Memory.from_cfg(cfg.get("memory"))
+        if cfg.get("pipeline") is not None:
+            kwargs["pipeline"] = Pipeline.from_cfg(cfg["pipeline"])
         return cls(**kwargs)
 
     @classmethod
@@ -61,13 +61,59 @@ class Model(Configurable):
         """Patch args into cfg."""
         return cfg
 
-    @garbage_collection
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        first_model_configurable_property: int,
+        second_model_configurable_property: float,
+        artifacts: Artifacts = None,
+        memory: Memory = None,
+        pipeline: Pipeline = None,
+    ) -> None:
+        """Initialize model.
+
+        Read artifacts (weights, pickled pipelines) inside each run:
+            weights = self.artifacts["weights"]
+
+        With a pipeline, runs read inputs.batches() micro-batches
+            and write each one as soon as it is processed.
+        """
+        self.first_model_configurable_property = (
+            first_model_configurable_property
+        )
+        self.second_model_configurable_property = (
+            second_model_configurable_property
+        )
+        self.artifacts = artifacts
+        self.memory = Memory() if memory is None else memory
+        self.pipeline = pipeline
+
     def __call__(self, inputs, outputs):
         """Run model."""
-        batch = inputs()
-        #  batch = self.transform(batch), if inputs doesn't perform transform
-        batch = self.predict(batch)
-        outputs(batch)
+        with self.memory(), span("model"):
+            if self.pipeline is not None:
+                self.pipeline(
+                    timed_iter("inputs", inputs.batches()),
+                    self.process,
+                    partial(timed, "outputs", outputs),
+                )
+                return
+            batch = timed("inputs", inputs)
+            timed("outputs", outputs, self.process(batch))
+
+    def process(self, batch) -> object:
+        """Process one batch or micro-batch of inputs into predictions."""
+        #  batch = timed("model.transform", self.transform, batch),
+        #    if inputs doesn't transform
+        return timed("model.predict", self.predict, batch)
+
+    def ping(self) -> bool:
+        """Ping.
+
+        Load model artifacts on startup.
+        """
+        if self.artifacts is None:
+            return True
+        return self.artifacts.ping()
 
     def transform(self, batch) -> object:
         """Transform.
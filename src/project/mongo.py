@@ -3,29 +3,86 @@
 from __future__ import annotations
 
 from argparse import Namespace
-from collections import namedtuple
+from atexit import register as atexit
+from collections import Counter, namedtuple
 from contextlib import contextmanager
-from functools import wraps
-from logging import INFO, basicConfig, getLogger
-from sys import stdout
-from time import sleep as block
+from itertools import islice
+from json import dumps
+from logging import getLogger
+from os import getpid, register_at_fork
+from threading import Lock
+from time import perf_counter
+from typing import Iterator
 from uuid import uuid4
 
-from pymongo import MongoClient
-from pymongo.errors import AutoReconnect
+from bson import BSON, ObjectId
+from pymongo import InsertOne, MongoClient, ReadPreference, ReplaceOne
+from pymongo.errors import AutoReconnect, BulkWriteError
 
+from .batching import adaptive, batches, width
+from .cache import Cache
 from .configurable import Configurable
-from .constants import BACKOFF, RETRIES
-
-basicConfig(
-    level=INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    stream=stdout,
+from .constants import (
+    BACKOFF,
+    BSON_BATCH_BYTES,
+    BSON_BATCH_OPS,
+    BSON_SAMPLE,
+    CHUNK_SIZE,
+    MONGO_POOL,
+    RETRIES,
+    RETRY_BUDGET,
 )
+from .lazy import lazy_import
+from .retry import Breakers, Retry
+from .telemetry import timed_iter, traced
+
 logger = getLogger(__name__)  # pylint: disable=invalid-name
 
+# pandas is optional for mongo, and loaded on first use
+cols = lazy_import(__package__ + ".columns")  # pylint: disable=invalid-name
+
+READ_OPTIONS = (
+    "allow_disk_use",
+    "batch_size",
+    "hint",
+    "max_time_ms",
+    "projection",
+    "read_preference",
+)
+READ_PREFERENCES = {
+    "nearest": ReadPreference.NEAREST,
+    "primary": ReadPreference.PRIMARY,
+    "primaryPreferred": ReadPreference.PRIMARY_PREFERRED,
+    "secondary": ReadPreference.SECONDARY,
+    "secondaryPreferred": ReadPreference.SECONDARY_PREFERRED,
+}
+
+
+def split_uri(uri: str) -> tuple:
+    """Return hosts and database of uri, without credentials or options."""
+    address = uri.split("://", 1)[-1].split("?", 1)[0]
+    hosts, _, database = address.partition("/")
+    return hosts.rsplit("@", 1)[-1], database or None
+
+
+def database_of(args: tuple) -> str:
+    """Return the database of a unit of work on a collection or a Mongo."""
+    for each in args:
+        database = getattr(getattr(each, "database", None), "name", None)
+        if isinstance(database, str):  # a collection
+            return database
+        uri = getattr(each, "uri", None)
+        if isinstance(uri, str):
+            return split_uri(uri)[1]
+    return None
 
-def retry_on_reconnect(retries=RETRIES, backoff=BACKOFF):
+
+BREAKERS = Breakers("mongo", database_of)
+
+
+def retry_on_reconnect(
+    retries=RETRIES, backoff=BACKOFF, budget=RETRY_BUDGET
+) -> Retry:
     """Retry decorator for AutoReconnect.
 
     The pymongo client does not retry operations even when
@@ -66,29 +123,90 @@ def retry_on_reconnect(retries=RETRIES, backoff=BACKOFF):
                         '_id': -1,
                     })
                 )
+
+    Retries use the shared jittered, budgeted policy (see Retry), and
+        the units of work of each database share one circuit breaker
+        (see BREAKERS).
     """
+    return Retry(
+        "mongo",
+        (AutoReconnect,),
+        retries=retries,
+        backoff=backoff,
+        budget=budget,
+        breaker=BREAKERS,
+    )
 
-    def wrapper(func):
-        """Return wrapped method."""
 
-        @wraps(func)
-        def wrapped(*args, **kwargs):
-            """Return method result."""
-            try:
-                return func(*args, **kwargs)
-            # coverage only with a replicaset and failover.
-            except AutoReconnect as retry:
-                logger.exception(retry)
-                for i in range(retries):
-                    try:
-                        return func(*args, **kwargs)
-                    except AutoReconnect:
-                        block(backoff * i)
-                raise
+class Clients:
+    """Clients.
 
-        return wrapped
+    Process-wide cache of MongoClients keyed by uri and pool options.
 
-    return wrapper
+    A MongoClient owns its own connection pool and is thread-safe,
+        so one client per uri is shared by every unit of work and
+        every retry, instead of paying for dns, tcp, tls, auth and
+        replica set discovery on each call.
+
+    MongoClients are not fork-safe: clients inherited from a parent
+        process are dropped (not closed) and reopened in the child.
+    """
+
+    OPTIONS = {
+        "connect": "connect",
+        "max_idle_time_ms": "maxIdleTimeMS",
+        "max_pool_size": "maxPoolSize",
+        "min_pool_size": "minPoolSize",
+    }
+
+    def __init__(self) -> None:
+        """Initialize clients."""
+        self._lock = Lock()
+        self._clients = {}
+        self.counters = {"close": 0, "open": 0, "reuse": 0}
+
+    def __call__(self, uri: str, pool: dict) -> MongoClient:
+        """Return a cached client for uri and pool options."""
+        key = (uri, tuple(sorted(pool.items())))
+        pid = getpid()
+        with self._lock:
+            entry = self._clients.get(key)
+            if entry is not None:
+                client, owner = entry
+                if owner == pid:
+                    self.counters["reuse"] += 1
+                    return client
+            kwargs = {
+                self.OPTIONS[name]: value
+                for name, value in pool.items()
+                if value is not None
+            }
+            client = MongoClient(uri, **kwargs)
+            self._clients[key] = (client, pid)
+            self.counters["open"] += 1
+            logger.info('{"mongo": "open"}')
+            return client
+
+    def close(self) -> None:
+        """Close clients opened by this process."""
+        pid = getpid()
+        with self._lock:
+            for client, owner in self._clients.values():
+                if owner == pid:
+                    client.close()
+                    self.counters["close"] += 1
+                    logger.info('{"mongo": "close"}')
+            self._clients.clear()
+
+    def after_fork(self) -> None:
+        """Drop clients inherited from the parent process."""
+        self._lock = Lock()
+        self._clients = {}
+
+
+CLIENTS = Clients()
+atexit(CLIENTS.close)
+register_at_fork(after_in_child=CLIENTS.after_fork)
 
 
 class Mongo(Configurable):
@@ -117,9 +235,10 @@ class Mongo(Configurable):
         the model or other component that uses them.
 
     Pull up common general purpose serialization/deserialization here:
-        df_to_bsonable
-        bson_to_df --import Dataframe within try/except to avoid making
-            all projects require pandas
+        df_to_bsonable (done)
+        write_df (done)
+        bson_to_df (done) --import Dataframe within try/except to avoid
+            making all projects require pandas
         list_to_bson
         dict_to_bson
     """
@@ -127,7 +246,26 @@ class Mongo(Configurable):
     @classmethod
     def from_cfg(cls, cfg: dict) -> Mongo:
         """Return model from cfg."""
-        collections = cfg["collections"]
+        collections, reads = {}, {}
+        for key, value in cfg["collections"].items():
+            if isinstance(value, dict):
+                value = dict(value)
+                collections[key] = value.pop("name")
+                unknown = set(value) - set(READ_OPTIONS)
+                if unknown:
+                    raise ValueError(
+                        "Unknown read options for %s: %s"
+                        % (key, ", ".join(sorted(unknown)))
+                    )
+                read_preference = value.get("read_preference")
+                if read_preference not in (None, *READ_PREFERENCES):
+                    raise ValueError(
+                        "Unknown read_preference for %s: %s"
+                        % (key, read_preference)
+                    )
+                reads[key] = value
+            else:
+                collections[key] = value
         collections_cls_name = "_Collections" + uuid4().hex
 
         class Collections(
@@ -142,25 +280,444 @@ class Mongo(Configurable):
                 """Return collections from cfg."""
                 return cls(**cfg)
 
-        kwargs = {
-            key: from_cfg(cfg[key])
-            for key, from_cfg in (
-                ("uri", str),
-                ("collections", Collections.from_cfg),
-            )
-        }
+        kwargs = {key: from_cfg(cfg[key]) for key, from_cfg in (("uri", str),)}
+        kwargs["collections"] = Collections.from_cfg(collections)
+        if reads:
+            kwargs["reads"] = reads
+        kwargs["pool"] = cls.pool_from_cfg(cfg.get("pool"))
+        if cfg.get("cache") is not None:
+            kwargs["cache"] = Cache.from_cfg(cfg["cache"])
         return cls(**kwargs)
 
+    @classmethod
+    def pool_from_cfg(cls, cfg: dict = None) -> dict:
+        """Return pool options from cfg, raise ValueError for unknown keys.
+
+        Keys are those of Clients.OPTIONS, checked here rather than on the
+            first connection.
+        """
+        pool = {**MONGO_POOL, **(cfg or {})}
+        unknown = set(pool) - set(Clients.OPTIONS)
+        if unknown:
+            raise ValueError(
+                "Unknown mongo pool options: %s" % ", ".join(sorted(unknown))
+            )
+        return pool
+
     @classmethod
     def patch_args(cls, args: Namespace, cfg: dict) -> dict:
         """Patch args into cfg, return cfg."""
         raise NotImplementedError()
 
-    def __init__(self, uri: str, collections: namedtuple) -> None:
+    @classmethod
+    @traced("mongo.read")
+    def bson_to_df(cls, cursor, schema: dict = None, size=CHUNK_SIZE):
+        """Return dataframe from a cursor of documents.
+
+        The cursor is consumed size documents at a time, each batch is
+            appended to typed column buffers, so the full list of
+            documents is never materialized.
+
+        schema maps column names to dotted paths into each document,
+            with an optional dtype:
+
+        schema = {
+            "id": "_id",
+            "patient_id": "patient.id",
+            "value": ("value", "float64"),
+        }
+        collections.labs.find(query, projection=Mongo.projection(schema))
+
+        Missing keys are nulls, ObjectIds are strings, and tz-aware
+            datetimes become datetime64[ns, UTC] columns.
+        Without a schema, columns are the top-level keys in order of
+            appearance.
+        """
+        paths, columns = cls._columns(schema)
+        count = 0
+        iterator = iter(cursor)
+        while True:
+            batch = list(islice(iterator, size))
+            if not batch:
+                break
+            count = cls._extend(batch, paths, columns, count, schema is None)
+            del batch
+        return cols.Column.to_df(list(columns.values()))
+
+    @classmethod
+    def _columns(cls, schema: dict = None) -> tuple:
+        """Return paths and empty columns for a bson_to_df schema."""
+        paths, columns = {}, {}
+        if schema is not None:
+            for name, value in schema.items():
+                if isinstance(value, str):
+                    value = (value, None)
+                path, dtype = value
+                paths[name] = path.split(".")
+                columns[name] = cols.Column(name, dtype)
+        return paths, columns
+
+    @classmethod
+    def _extend(  # pylint: disable=too-many-arguments
+        cls, batch, paths, columns, count, discover
+    ) -> int:
+        """Append a batch of documents to columns, return the new count."""
+        if discover:
+            cls._discover(batch, paths, columns, count)
+        for name, column in columns.items():
+            path = paths[name]
+            column.extend([cls._get(each, path) for each in batch])
+        return count + len(batch)
+
+    @classmethod
+    def projection(cls, schema: dict) -> dict:
+        """Return find projection for a bson_to_df schema."""
+        projection = {"_id": 0}
+        for value in schema.values():
+            path = value if isinstance(value, str) else value[0]
+            projection[path] = 1
+        return projection
+
+    @classmethod
+    def _discover(cls, batch, paths, columns, count) -> None:
+        """Add columns for new top-level keys, backfilling nulls."""
+        for each in batch:
+            for key in each:
+                if key not in columns:
+                    paths[key] = [key]
+                    columns[key] = column = cols.Column(key)
+                    column.extend((None,) * count)
+
+    @classmethod
+    def _get(cls, document, path):
+        """Return the value at path in document, None when missing."""
+        value = document
+        for key in path:
+            if not isinstance(value, dict):
+                return None
+            value = value.get(key)
+        if isinstance(value, ObjectId):
+            return str(value)
+        return value
+
+    @classmethod
+    def df_to_bsonable(cls, df) -> list:
+        """Return a list of bson-able documents from df.
+
+        Values are converted one column at a time: numpy scalars to
+            python scalars, datetime64 to Timestamp (a datetime), and
+            NaN/NaT to None.
+        """
+        keys = [str(each) for each in df.columns]
+        columns = [
+            cls._series_to_bsonable(df.iloc[:, i]) for i in range(len(keys))
+        ]
+        return [dict(zip(keys, values)) for values in zip(*columns)]
+
+    @classmethod
+    def _series_to_bsonable(cls, series) -> list:
+        """Return a list of bson-able values from series."""
+        values = series.to_numpy(dtype=object)
+        mask = series.isna().to_numpy()
+        if mask.any():
+            values[mask] = None
+        return values.tolist()
+
+    @classmethod
+    def batch_size(
+        cls, df, max_bytes=BSON_BATCH_BYTES, max_ops=BSON_BATCH_OPS
+    ) -> int:
+        """Return rows per batch to stay under max_bytes and max_ops.
+
+        Document size is estimated from an encoded sample of df;
+            pymongo still splits any batch that exceeds the server limits.
+        """
+        sample = cls.df_to_bsonable(df.iloc[:BSON_SAMPLE])
+        if not sample:
+            return max_ops
+        size = sum(len(BSON.encode(each)) for each in sample) / len(sample)
+        return max(1, min(max_ops, int(max_bytes / (size * 1.25))))
+
+    @classmethod
+    def write_ops(cls, documents: list, keys=None) -> list:
+        """Return idempotent write operations for documents.
+
+        With keys, replace documents matching keys, upserting missing ones.
+        Without keys, insert documents with client-assigned _ids, so a
+            retried insert collides with itself (duplicate key) instead of
+            duplicating the document.
+        """
+        if keys:
+            return [
+                ReplaceOne({key: each[key] for key in keys}, each, upsert=True)
+                for each in documents
+            ]
+        for each in documents:
+            each.setdefault("_id", ObjectId())
+        return [InsertOne(each) for each in documents]
+
+    @classmethod
+    def bulk_write(cls, collection, ops: list) -> dict:
+        """Write ops unordered, return counts.
+
+        Retried on AutoReconnect. On a retry, duplicate _id errors of
+            inserts are ignored: they are inserts already applied by an
+            earlier attempt of the same batch. Other errors raise.
+        """
+        attempts = []
+
+        @retry_on_reconnect()
+        def write(collection, ops):
+            retried = bool(attempts)
+            attempts.append(retried)
+            try:
+                result = collection.bulk_write(ops, ordered=False)
+            except BulkWriteError as e:
+                return cls.bulk_error_counts(e, ops, retried)
+            return cls.bulk_counts(result)
+
+        return write(collection, ops)
+
+    @classmethod
+    def is_reapplied(cls, write_error: dict, ops: list) -> bool:
+        """Return True for a duplicate _id error of an insert."""
+        if write_error.get("code") != 11000:
+            return False
+        if not isinstance(ops[write_error["index"]], InsertOne):
+            return False
+        key_pattern = write_error.get("keyPattern")
+        if key_pattern is not None:
+            return list(key_pattern) == ["_id"]
+        return "index: _id_ " in write_error.get("errmsg", "")
+
+    @classmethod
+    def bulk_counts(cls, result) -> dict:
+        """Return counts of a BulkWriteResult."""
+        return {
+            "inserted": result.inserted_count,
+            "matched": result.matched_count,
+            "modified": result.modified_count,
+            "upserted": result.upserted_count,
+        }
+
+    @classmethod
+    def bulk_error_counts(
+        cls, error: BulkWriteError, ops: list, retried: bool
+    ) -> dict:
+        """Return counts of a BulkWriteError of re-applied inserts only.
+
+        Raise error when it has any other write or write concern error,
+            including duplicate keys of a first attempt or of a unique
+            index other than _id. Re-applied inserts count as inserted.
+        """
+        details = error.details
+        if (
+            not retried
+            or details.get("writeConcernErrors")
+            or not all(
+                cls.is_reapplied(each, ops) for each in details["writeErrors"]
+            )
+        ):
+            raise error
+        return {
+            "inserted": details["nInserted"] + len(details["writeErrors"]),
+            "matched": details["nMatched"],
+            "modified": details["nModified"],
+            "upserted": details["nUpserted"],
+        }
+
+    @classmethod
+    @traced("mongo.write")
+    def write_df(
+        cls,
+        collection,
+        df,
+        keys=None,
+        max_bytes=BSON_BATCH_BYTES,
+        max_ops=BSON_BATCH_OPS,
+    ) -> dict:
+        """Write df to collection in size-bounded, unordered bulk writes.
+
+        with my_output.collections() as collections:
+            my_output.write_df(collections.predictions, df, keys=("id",))
+
+        Each batch is converted just before it is written and retried
+            on its own, see _write_batches.
+        """
+        counts = Counter()
+        for ops in cls._write_batches(
+            collection, df, counts, keys, max_bytes, max_ops
+        ):
+            counts.update(cls.bulk_write(collection, ops))
+        return dict(counts)
+
+    @classmethod
+    def _write_batches(  # pylint: disable=too-many-arguments
+        cls,
+        collection,
+        df,
+        counts: Counter,
+        keys=None,
+        max_bytes=BSON_BATCH_BYTES,
+        max_ops=BSON_BATCH_OPS,
+    ) -> Iterator[list]:
+        """Yield write ops of df, one batch at a time.
+
+        Shared by write_df and AsyncMongo.awrite_df: the caller writes
+            each batch and adds the result to counts before asking for
+            the next one.
+        Batch sizes adapt to the latency and document width of the
+            writes (see Batching, mongo.write) within the bson bounds.
+        """
+        counts.update(inserted=0, matched=0, modified=0, upserted=0)
+        bound = cls.batch_size(df, max_bytes, max_ops)
+        controller = adaptive("mongo.write")
+        start, size = 0, bound
+        while start < len(df):
+            size = min(bound, controller.size())
+            end = start + size
+            begin = perf_counter()
+            documents = cls.df_to_bsonable(df.iloc[start:end])
+            yield cls.write_ops(documents, keys)
+            controller.observe(
+                len(documents), perf_counter() - begin, width(documents)
+            )
+            del documents
+            start = end
+        logger.info(
+            '{"mongo.write": {"collection": "%s", "batch": %d, "counts": %s}}',
+            collection.name,
+            size,
+            dumps(counts),
+        )
+
+    def __init__(
+        self,
+        uri: str,
+        collections: namedtuple,
+        pool: dict = None,
+        cache: Cache = None,
+        reads: dict = None,
+    ) -> None:
         """Initialize Mongo."""
+        if pool is None:
+            pool = MONGO_POOL
         self.uri = uri
+        self.pool = pool
+        self.cache = cache
+        self.reads = {} if reads is None else reads
         self._collections = collections
 
+    def find_to_dfs(
+        self, key: str, query: dict, schema: dict = None, sort: list = None
+    ) -> Iterator:
+        """Yield dataframes of at most batch_size documents of a find.
+
+        Read options of each collection come from cfg:
+
+        collections:
+          watermarks: watermarks
+          labs:
+            name: labs
+            batch_size: 10000  # documents per df, default adaptive
+            projection: {_id: 0, id: 1, value: 1}  # without a schema
+            hint: patient_id_1_valid_on_1
+            max_time_ms: 600000
+            read_preference: secondaryPreferred
+            allow_disk_use: true
+
+        for df in labs_input.find_to_dfs("labs", query, schema):
+            ...
+
+        The server-side cursor is consumed one batch at a time, so
+            memory stays constant whatever the size of the result.
+        Without batch_size, chunk sizes adapt to the latency and
+            document width of the reads (see Batching, mongo.read).
+        Chunks have the columns of the schema, or without one, every
+            top-level key seen so far.
+        A failure mid-stream raises; retry the whole unit of work.
+        """
+        options = self.reads.get(key, {})
+        size = options.get("batch_size")
+        projection = options.get("projection")
+        if schema is not None:
+            projection = self.projection(schema)
+        kwargs = {
+            name: options[name]
+            for name in ("allow_disk_use", "hint", "max_time_ms")
+            if options.get(name) is not None
+        }
+        with self.collections() as collections:
+            cursor = getattr(collections, key).find(
+                query, projection, batch_size=size or 0, sort=sort, **kwargs
+            )
+            try:
+                yield from timed_iter(
+                    "mongo.read", self._chunks(cursor, schema, size)
+                )
+            finally:
+                cursor.close()
+
+    @classmethod
+    def _chunks(cls, cursor, schema: dict, size: int = None) -> Iterator:
+        """Yield dfs of size documents, keeping discovered columns.
+
+        Each column starts with the dtype of the previous chunks, and is
+            promoted when values do not fit (see Column), so chunks share
+            one schema as far as the values allow. Chunks already
+            yielded keep the earlier dtype.
+        """
+        paths, _ = cls._columns(schema)
+        iterator = iter(cursor)
+        dtypes = {}
+
+        def fetch(limit):
+            return list(islice(iterator, limit))
+
+        for batch in batches(fetch, "mongo.read", size):
+            _, columns = cls._columns(schema)
+            for name in paths:
+                if name not in columns:
+                    columns[name] = cols.Column(name)
+                if name in dtypes:
+                    columns[name].dtype, columns[name].tz = dtypes[name]
+            cls._extend(batch, paths, columns, 0, schema is None)
+            del batch
+            dtypes.update(
+                (name, (each.dtype, each.tz))
+                for name, each in columns.items()
+                if each.dtype is not None  # not only nulls so far
+            )
+            yield cols.Column.to_df(list(columns.values()))
+
+    def cached_find_to_df(  # pylint: disable=too-many-arguments
+        self, key: str, query: dict, schema: dict = None, name=None, ttl=None
+    ):
+        """Find documents in collection key into a df through the cache.
+
+        A connection is borrowed only on a cache miss.
+        See Cache for ttls and invalidation.
+        """
+
+        @retry_on_reconnect()
+        def load():
+            projection = None if schema is None else self.projection(schema)
+            with self.collections() as collections:
+                cursor = getattr(collections, key).find(query, projection)
+                return self.bson_to_df(cursor, schema)
+
+        if self.cache is None:
+            return load()
+        text = "%s.find" % getattr(self._collections, key)
+        return self.cache(
+            load,
+            text,
+            [query, schema],
+            name,
+            ttl,
+            source="/".join(map(str, split_uri(self.uri))),
+        )
+
     @contextmanager
     def collections(self) -> None:
         """Contextmanager for collections.
@@ -177,24 +734,39 @@ class Mongo(Configurable):
         """
         with self.database() as database:
             kwargs = {
-                key: database[value]
+                key: self.collection(database, key, value)
                 for key, value in self._collections._asdict().items()
             }
             yield self._collections.__class__(**kwargs)
 
+    def collection(self, database, key: str, name: str):
+        """Return collection name with the read preference of key."""
+        read_preference = self.reads.get(key, {}).get("read_preference")
+        if read_preference is None:
+            return database[name]
+        return database.get_collection(
+            name, read_preference=READ_PREFERENCES[read_preference]
+        )
+
     @contextmanager
     def connection(self) -> None:
         """Contextmanager for connection.
 
         Authentication is handled transparently by the
             MongoClient with a uri.
+
+        The connection is borrowed from the process-wide CLIENTS cache
+            and stays open on exit. Configure the pool in cfg:
+
+        pool:
+          max_pool_size: 100
+          min_pool_size: 0
+          max_idle_time_ms: 60000
+          connect: false  # defer connecting until first use; fork-safe
+
+        CLIENTS.counters reports open and reuse counts.
         """
-        with MongoClient(self.uri) as connection:
-            logger.info('{"mongo": "open"}')
-            try:
-                yield connection
-            finally:
-                logger.info('{"mongo": "close"}')
+        yield CLIENTS(self.uri, self.pool)
 
     @contextmanager
     def database(self) -> None:
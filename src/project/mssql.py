@@ -3,56 +3,264 @@
 from __future__ import annotations
 
 import re
+from atexit import register as atexit
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
-from functools import wraps
-from logging import INFO, basicConfig, getLogger
-from sys import stdout
-from time import sleep as block
+from functools import partial
+from json import dumps
+from logging import getLogger
+from os import getpid
+from threading import Condition, Lock
+from time import monotonic
+from typing import Iterator
 from urllib.parse import parse_qsl, unquote
-
-from pandas import DataFrame
+from uuid import uuid4
 
 # pylint: disable=no-name-in-module
-from pymssql import DatabaseError, InterfaceError, OperationalError
+from pymssql import (
+    BINARY,
+    DATETIME,
+    DECIMAL,
+    STRING,
+    DatabaseError,
+    InterfaceError,
+    OperationalError,
+)
 from pymssql import connect as MssqlConnection
 
+from .batching import batches
+from .cache import Cache
 from .configurable import Configurable
-from .constants import BACKOFF, RETRIES
-
-basicConfig(
-    level=INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    stream=stdout,
+from .constants import (
+    BACKOFF,
+    KEYS_CHUNK,
+    MSSQL_POOL_IDLE,
+    MSSQL_POOL_LIFETIME,
+    MSSQL_POOL_SIZE,
+    MSSQL_POOL_TIMEOUT,
+    RETRIES,
+    RETRY_BUDGET,
 )
+from .lazy import lazy_import
+from .queries import Queries
+from .retry import Breakers, Retry
+from .telemetry import span, timed, traced
+
 logger = getLogger(__name__)  # pylint: disable=invalid-name
 
+np = lazy_import("numpy")  # pylint: disable=invalid-name
+pd = lazy_import("pandas")  # pylint: disable=invalid-name
+cols = lazy_import(__package__ + ".columns")  # pylint: disable=invalid-name
+
+KEYS = "{keys}"
+KEY_KINDS = re.compile(
+    r"(?:bigint|int|smallint|tinyint|uniqueidentifier|date|datetime2?"
+    r"|n?(?:var)?char\(\d{1,4}\)|decimal\(\d{1,2}(?:,\s*\d{1,2})?\))",
+    re.IGNORECASE,
+)
+
+
+def database_of(args: tuple) -> str:
+    """Return "host/database" of a unit of work on a Uri or an Input."""
+    if not args:
+        return None
+    uri = getattr(args[0], "uri", args[0])
+    host = getattr(uri, "host", None)
+    if host is None:
+        return None
+    return "%s/%s" % (host, getattr(uri, "database", None))
+
+
+BREAKERS = Breakers("mssql", database_of)
+PERMANENT_ERRORS = {
+    4060,  # cannot open database
+    18456,  # login failed
+}
 
-def retry_on_operational_error(retries=RETRIES, backoff=BACKOFF):
+
+def is_permanent(error: OperationalError) -> bool:
+    """Return True for OperationalErrors that a retry cannot fix."""
+    number, *_ = error.args or (None,)
+    return number in PERMANENT_ERRORS
+
+
+def retry_on_operational_error(
+    retries=RETRIES, backoff=BACKOFF, budget=RETRY_BUDGET
+) -> Retry:
     """Retry decorator for OperationalErrors.
 
     Use this decorator to make operations resilient to db failure.
+
+    Retries use the shared jittered, budgeted policy (see Retry), and
+        the units of work of each database share one circuit breaker
+        (see BREAKERS).
+    Login and missing database errors are not retried.
     """
+    return Retry(
+        "mssql",
+        (OperationalError,),
+        is_permanent=is_permanent,
+        retries=retries,
+        backoff=backoff,
+        budget=budget,
+        breaker=BREAKERS,
+    )
 
-    def wrapper(func):
-        """Return wrapped method."""
 
-        @wraps(func)
-        def wrapped(*args, **kwargs):
-            """Return method result."""
-            try:
-                return func(*args, **kwargs)
-            except OperationalError as retry:
-                logger.exception(retry)
-                for i in range(retries):
-                    try:
-                        return func(*args, **kwargs)
-                    except OperationalError:
-                        block(backoff * i)
-                raise
+class PoolTimeout(TimeoutError):
+    """No pooled mssql connection was free within the pool timeout."""
+
+
+class Pool:  # pylint: disable=too-many-instance-attributes
+    """Pool.
+
+    Bounded, thread-safe pool of mssql connections.
 
-        return wrapped
+    Connections idle for at least idle seconds are probed when borrowed,
+        so busy connections cost no extra round trip, and are replaced
+        when the probe fails or when they are older than lifetime seconds.
+    Connections that raised an OperationalError or InterfaceError are
+        closed instead of being returned to the pool, so a failed query
+        never hands a dead connection to the next borrower.
+    Connections inherited from a parent process are dropped in the child.
+    A borrow waits at most timeout seconds for a free connection, then
+        raises PoolTimeout, so a leaked or nested borrow (a second
+        borrow while holding the only connection) fails instead of
+        hanging the service.
+    """
 
-    return wrapper
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        connect,
+        probe,
+        size: int,
+        lifetime: int,
+        idle: float = MSSQL_POOL_IDLE,
+        timeout: float = MSSQL_POOL_TIMEOUT,
+    ) -> None:
+        """Initialize pool."""
+        self.connect = connect
+        self.probe = probe
+        self.size = size
+        self.lifetime = lifetime
+        self.idle = idle
+        self.timeout = timeout
+        self._condition = Condition()
+        self._count = 0
+        self._idle = []
+        self._pid = getpid()
+
+    def borrow(self) -> tuple:
+        """Return a live (connection, created) pair, waiting when full.
+
+        Raise PoolTimeout when no connection is free within timeout.
+        """
+        deadline = monotonic() + self.timeout
+        while True:
+            with self._condition:
+                if self._pid != getpid():
+                    self._count, self._idle, self._pid = 0, [], getpid()
+                self._wait(deadline)
+                if not self._idle:
+                    self._count += 1
+                    break
+                connection, created, returned = self._idle.pop()
+            if self.usable(connection, created, returned):
+                return connection, created
+            self.discard(connection)
+        try:
+            connection = self.connect()
+        except BaseException:
+            with self._condition:
+                self._count -= 1
+                self._condition.notify()
+            raise
+        logger.info('{"mssql": "open"}')
+        return connection, monotonic()
+
+    def _wait(self, deadline: float) -> None:
+        """Wait, holding the condition, until a connection is free."""
+        while not self._idle and self._count >= self.size:
+            remaining = deadline - monotonic()
+            if remaining <= 0:
+                raise PoolTimeout(
+                    "No mssql connection free within %s seconds, pool_size %d"
+                    % (self.timeout, self.size)
+                )
+            self._condition.wait(remaining)
+
+    def usable(self, connection, created: float, returned: float) -> bool:
+        """Return True when an idle connection may be borrowed as is."""
+        now = monotonic()
+        if now - created >= self.lifetime:
+            return False
+        return now - returned < self.idle or self.alive(connection)
+
+    def alive(self, connection) -> bool:
+        """Return True when the connection answers the probe."""
+        try:
+            with connection.cursor() as cursor:
+                return self.probe(cursor)
+        except (DatabaseError, InterfaceError, OperationalError) as e:
+            logger.warning(e)
+            return False
+
+    def give_back(self, connection, created: float) -> None:
+        """Return a healthy connection to the pool."""
+        with self._condition:
+            self._idle.append((connection, created, monotonic()))
+            self._condition.notify()
+
+    def discard(self, connection) -> None:
+        """Close a connection and free its slot."""
+        try:
+            connection.close()
+        except (DatabaseError, InterfaceError, OperationalError) as e:
+            logger.warning(e)
+        logger.info('{"mssql": "close"}')
+        with self._condition:
+            self._count -= 1
+            self._condition.notify()
+
+    def close(self) -> None:
+        """Close idle connections."""
+        with self._condition:
+            if self._pid != getpid():
+                return
+            idle, self._idle = self._idle, []
+        for connection, *_ in idle:
+            self.discard(connection)
+
+
+POOLS = {}
+POOLS_LOCK = Lock()
+
+
+def pool_of(uri: Uri) -> Pool:
+    """Return the pool shared by every uri with the same connection.
+
+    Each pool is created, and its close registered atexit, once, however
+        many Uri instances are made from the same cfg.
+    """
+    key = tuple(sorted(uri.connection_kwargs().items())) + (
+        uri.pool_size,
+        uri.pool_lifetime,
+        uri.pool_idle,
+        uri.pool_timeout,
+    )
+    with POOLS_LOCK:
+        pool = POOLS.get(key)
+        if pool is None:
+            pool = POOLS[key] = Pool(
+                uri.connect,
+                uri.probe,
+                uri.pool_size,
+                uri.pool_lifetime,
+                uri.pool_idle,
+                uri.pool_timeout,
+            )
+            atexit(pool.close)
+    return pool
 
 
 class Uri(
@@ -98,6 +306,10 @@ class Uri(
             ("conn_properties", str),
             ("autocommit", bool),
             ("tds_version", str),
+            ("pool_size", int),
+            ("pool_lifetime", int),
+            ("pool_idle", float),
+            ("pool_timeout", float),
         ):
             value = query.get(key, None)
             if value is not None:
@@ -152,8 +364,21 @@ class Uri(
         conn_properties: str = None,
         autocommit: bool = False,
         tds_version: str = None,
+        pool_size: int = MSSQL_POOL_SIZE,
+        pool_lifetime: int = MSSQL_POOL_LIFETIME,
+        pool_idle: float = MSSQL_POOL_IDLE,
+        pool_timeout: float = MSSQL_POOL_TIMEOUT,
     ) -> object:
-        """Initialize mssql uri."""
+        """Initialize mssql uri.
+
+        Connections are pooled, configure the pool in the uri query:
+            mssql://...?pool_size=4&pool_lifetime=1800&pool_idle=30
+                &pool_timeout=60
+        Uris with the same connection and pool share one pool.
+        Do not borrow twice in one thread (for example keys_to_df inside
+            rollback): with pool_size=1 the second borrow raises
+            PoolTimeout.
+        """
         if charset is None:
             charset = "UTF-8"
         if port is None:
@@ -173,30 +398,52 @@ class Uri(
         self.conn_properties = conn_properties
         self.autocommit = autocommit
         self.tds_version = tds_version
+        self.pool_size = pool_size
+        self.pool_lifetime = pool_lifetime
+        self.pool_idle = pool_idle
+        self.pool_timeout = pool_timeout
+        self.pool = pool_of(self)
+
+    def connection_kwargs(self) -> dict:
+        """Return the kwargs of a new mssql connection."""
+        return {
+            "host": self.host,
+            "user": self.username,
+            "password": self.password,
+            "port": self.port,
+            "database": self.database,
+            "timeout": self.timeout,
+            "login_timeout": self.login_timeout,
+            "charset": self.charset,
+            "as_dict": self.as_dict,
+            "appname": self.appname,
+            "conn_properties": self.conn_properties,
+            "autocommit": self.autocommit,
+            "tds_version": self.tds_version,
+        }
+
+    def connect(self):
+        """Return a new mssql connection."""
+        return MssqlConnection(**self.connection_kwargs())
 
     @contextmanager
     def connection(self):
-        """Mssql connection contextmanager."""
-        with MssqlConnection(
-            host=self.host,
-            user=self.username,
-            password=self.password,
-            port=self.port,
-            database=self.database,
-            timeout=self.timeout,
-            login_timeout=self.login_timeout,
-            charset=self.charset,
-            as_dict=self.as_dict,
-            appname=self.appname,
-            conn_properties=self.conn_properties,
-            autocommit=self.autocommit,
-            tds_version=self.tds_version,
-        ) as connection:
-            try:
-                logger.info('{"mssql": "open"}')
-                yield connection
-            finally:
-                logger.info('{"mssql": "close"}')
+        """Mssql connection contextmanager.
+
+        Borrow a connection from the pool, and return it on exit.
+        """
+        connection, created = self.pool.borrow()
+        broken = False
+        try:
+            yield connection
+        except (InterfaceError, OperationalError):
+            broken = True
+            raise
+        finally:
+            if broken:
+                self.pool.discard(connection)
+            else:
+                self.pool.give_back(connection, created)
 
     @contextmanager
     def commit(self):
@@ -222,7 +469,12 @@ class Uri(
 
     @retry_on_operational_error()
     def ping(self, cursor) -> bool:
-        """Ping."""  # pylint: disable=no-self-use
+        """Ping."""
+        return self.probe(cursor)
+
+    @staticmethod
+    def probe(cursor) -> bool:
+        """Probe without retry, used to check pooled connections."""
         cursor.execute("""select 1 as n""")
         for _ in cursor.fetchall():
             return True
@@ -239,24 +491,376 @@ class Input(Configurable):  # pylint: disable=abstract-method
             key: from_cfg(cfg[key])
             for key, from_cfg in (("tables", list), ("uri", Uri.from_cfg))
         }
+        for key, from_cfg in (
+            ("cache", Cache.from_cfg),
+            ("queries", Queries.from_cfg),
+        ):
+            if cfg.get(key) is not None:
+                kwargs[key] = from_cfg(cfg[key])
         return cls(**kwargs)
 
     @classmethod
-    def query_to_df(cls, cursor, query, params=None) -> DataFrame:
-        """Query to dataframe."""
+    @traced("mssql.query")
+    def query_to_df(
+        cls, cursor, query, params=None, size=None
+    ) -> pd.DataFrame:
+        """Query to dataframe.
+
+        When size is given, rows are fetched in chunks of size rows and
+            the chunks are concatenated only at the end, so the raw row
+            tuples are never held alongside the whole dataframe.
+        """
+        if size is not None:
+            return pd.concat(
+                list(cls.query_to_dfs(cursor, query, params, size)),
+                ignore_index=True,
+            )
         cursor.execute(query, params)
         columns = (each[0] for each in cursor.description)
-        df = DataFrame(cursor.fetchall())
+        df = pd.DataFrame(cursor.fetchall())
         if df.empty:
-            df = DataFrame(columns=columns)
+            df = pd.DataFrame(columns=columns)
         else:
             df.columns = columns
         return df
 
-    def __init__(self, uri: Uri, tables: list) -> None:
+    @classmethod
+    def query_to_dfs(
+        cls, cursor, query, params=None, size=None
+    ) -> Iterator[pd.DataFrame]:
+        """Query to dataframe chunks of at most size rows.
+
+        Without size, chunk sizes adapt to the round trip latency and
+            row width of the query (see Batching, mssql.read).
+
+        with self.rollback() as cursor:
+            for df in self.query_to_dfs(cursor, query, params):
+                ...
+
+        Dtypes inferred from the first chunk are applied to later chunks
+            so that every chunk has the same schema. When a later chunk
+            cannot be cast (for example nulls in an integer column),
+            the column is promoted to a common dtype (int64 with nulls
+            to float64) for that and all following chunks.
+        A column with only nulls so far takes the dtype of its first
+            chunk with values.
+        """
+        cursor.execute(query, params)
+        columns = [each[0] for each in cursor.description]
+        dtypes = None
+        for rows in batches(cursor.fetchmany, "mssql.read", size):
+            # positional labels tolerate duplicate column names
+            df = pd.DataFrame.from_records(rows, columns=range(len(columns)))
+            del rows
+            if dtypes is None:
+                dtypes = [
+                    dtype if df[i].notna().any() else None
+                    for i, dtype in enumerate(df.dtypes)
+                ]
+            else:
+                cls._stable_dtypes(df, dtypes)
+            df.columns = columns
+            yield df
+        if dtypes is None:
+            yield pd.DataFrame(columns=columns)
+
+    @classmethod
+    @traced("mssql.query")
+    def query_to_columnar_df(
+        cls, cursor, query, params=None, size=None
+    ) -> pd.DataFrame:
+        """Query to dataframe, filling typed column buffers while fetching.
+
+        Drop-in alternative to query_to_df that avoids the list of row
+            tuples and object dtypes for numeric and datetime columns.
+        Dtypes are taken from cursor.description where it is specific
+            and inferred from values for numbers (int, float or bit).
+        Decimals are stored as float64.
+        Without size, fetches adapt as in query_to_dfs.
+        """
+        cursor.execute(query, params)
+        columns = [
+            cols.Column(each[0], cls.dtype_from_type_code(each[1]))
+            for each in cursor.description
+        ]
+        for rows in batches(cursor.fetchmany, "mssql.read", size):
+            for column, values in zip(columns, zip(*rows)):
+                column.extend(values)
+            del rows
+        return cols.Column.to_df(columns)
+
+    @classmethod
+    def dtype_from_type_code(cls, type_code) -> object:
+        """Return numpy dtype for a cursor.description type code.
+
+        Return None when the dtype must be inferred from the values.
+        """
+        for each, dtype in (
+            (BINARY, "object"),
+            (DATETIME, "datetime64[ns]"),
+            (DECIMAL, "float64"),
+            (STRING, "object"),
+        ):
+            if type_code == each:
+                return dtype
+        return None
+
+    @classmethod
+    def _stable_dtypes(cls, df: pd.DataFrame, dtypes: list) -> None:
+        """Cast df columns to dtypes, promoting dtypes that do not fit.
+
+        A cast must be lossless: no value changes (1.5 to 1) and no null
+            becomes a value (None to False). Otherwise the column is cast
+            to the common dtype of both (see _common_dtype), which is used
+            for the following chunks.
+        A dtype of None (only nulls so far) is set by the first chunk
+            with values; a chunk of only nulls never sets a dtype.
+        Chunks already yielded keep the earlier dtype.
+        """
+        for i, dtype in enumerate(dtypes):
+            series = df[i]
+            if dtype is None:
+                if series.notna().any():
+                    dtypes[i] = series.dtype
+                continue
+            if series.dtype == dtype:
+                continue
+            cast = cls._lossless_cast(series, dtype)
+            if cast is None:
+                promoted = cls._common_dtype(series, dtype)
+                logger.warning(
+                    '{"mssql.dtype": '
+                    '{"column": %d, "from": "%s", "to": "%s"}}',
+                    i,
+                    dtype,
+                    promoted,
+                )
+                dtypes[i] = promoted
+                cast = series.astype(promoted)
+            df[i] = cast
+
+    @classmethod
+    def _common_dtype(cls, series: pd.Series, dtype) -> object:
+        """Return a dtype holding the values of series and of dtype.
+
+        The dtype of a series of only nulls does not count. Integers
+            with nulls are float64, booleans with nulls and mixed kinds
+            (numbers and datetimes) are object.
+        """
+        if series.notna().any():
+            try:
+                dtype = np.result_type(dtype, series.dtype)
+            except TypeError:  # extension or incompatible dtypes
+                return np.dtype("object")
+        if series.isna().any():
+            kind = getattr(dtype, "kind", "O")
+            if kind in ("i", "u"):
+                return np.dtype("float64")
+            if kind == "b":
+                return np.dtype("object")
+        return dtype
+
+    @classmethod
+    def _lossless_cast(cls, series: pd.Series, dtype) -> pd.Series:
+        """Return series cast to dtype, or None when the cast loses data."""
+        try:
+            cast = series.astype(dtype)
+            notnull = series.notna()
+            if not cast.notna().equals(notnull):
+                return None
+            back = cast.astype(series.dtype)
+            if not (back[notnull] == series[notnull]).all():
+                return None
+        except (TypeError, ValueError, OverflowError):
+            return None
+        return cast
+
+    def __init__(
+        self,
+        uri: Uri,
+        tables: list,
+        cache: Cache = None,
+        queries: Queries = None,
+    ) -> None:
         """Initialize input."""
         self.uri = uri
         self.tables = tables
+        self.cache = cache
+        self.queries = Queries({}) if queries is None else queries
+
+    def registered_query_to_df(
+        self, cursor, name: str, params: dict = None, size=None
+    ) -> pd.DataFrame:
+        """Query name from the registry to dataframe.
+
+        Params must match the parameters the query declares.
+        Each call is timed in a mssql.query.<name> span with its rows.
+        """
+        query = self.queries[name]
+        return timed(
+            "mssql.query." + name,
+            self.query_to_df,
+            cursor,
+            query.text,
+            query.bind(params),
+            size,
+        )
+
+    def cached_query_to_df(  # pylint: disable=too-many-arguments
+        self, query, params=None, name=None, ttl=None, size=None
+    ) -> pd.DataFrame:
+        """Query to dataframe through the on-disk cache.
+
+        Use for reference tables and overlapping lookback windows.
+        A connection is borrowed only on a cache miss.
+        See Cache for ttls and invalidation.
+        """
+
+        def load():
+            with self.rollback() as cursor:
+                return self.query_to_df(cursor, query, params, size)
+
+        if self.cache is None:
+            return load()
+        return self.cache(
+            load, query, params, name, ttl, source=database_of((self,))
+        )
+
+    def keys_to_df(  # pylint: disable=too-many-arguments
+        self,
+        query: str,
+        keys,
+        kind: str = "bigint",
+        params: dict = None,
+        method: str = None,
+        chunk: int = KEYS_CHUNK,
+    ) -> pd.DataFrame:
+        """Query to dataframe for a large set of keys.
+
+        df = self.keys_to_df(
+            "select id, patient_id, value from labs "
+            "where patient_id in ({keys}) and valid_on > %(since)s",
+            patient_ids,
+            params={"since": since},
+        )
+
+        {keys} in query is replaced, as text so other braces are left
+            alone, by:
+            table: "select id from #keys_...", a temp table of the
+                distinct keys, of sql type kind, loaded by bulk copy,
+                and read in adaptive chunks (see Batching).
+            batches: "%(_k0)s, ..." for chunk distinct keys per query,
+                with chunks run concurrently over pooled connections.
+        Without method, a single batch is run when the keys fit in one
+            chunk, and a temp table is used otherwise.
+        Kind must be a key type of KEY_KINDS, such as bigint or
+            varchar(32), and the temp table name is unique per call, so
+            one left by a failed drop never collides with the next.
+        Chunks are padded to chunk keys so every query has the same
+            text. Rows are concatenated in chunk order.
+        """
+        if KEY_KINDS.fullmatch(kind) is None:
+            raise ValueError("Unsupported key kind %s" % kind)
+        if KEYS not in query:
+            raise ValueError("Query has no %s" % KEYS)
+        tolist = getattr(keys, "tolist", None)  # numpy and pandas
+        keys = list(dict.fromkeys(keys if tolist is None else tolist()))
+        if method is None:
+            method = "batches" if len(keys) <= chunk else "table"
+        with span("mssql.keys", len(keys)) as each:
+            if method == "table":
+                df = self.keys_table_to_df(query, keys, kind, params)
+            elif method == "batches":
+                df = self.keys_batches_to_df(query, keys, params, chunk)
+            else:
+                raise ValueError("Unknown keys method %s" % method)
+            each.rows_out = len(df)
+        return df
+
+    @retry_on_operational_error()
+    def keys_table_to_df(
+        self, query: str, keys: list, kind: str, params: dict = None
+    ) -> pd.DataFrame:
+        """Query to dataframe joined to a #keys temp table of keys.
+
+        Params are always a mapping, as in keys_batches_to_df, so pymssql
+            substitutes, and unescapes %% in, the query the same way for
+            both methods.
+        When the query fails, a failed drop of the temp table is logged
+            so the error of the query is the one raised.
+        """
+        table = "#keys_%s" % uuid4().hex
+        sql = query.replace(KEYS, "select id from %s" % table)
+        drop = "drop table %s" % table
+        with self.rollback() as cursor:
+            cursor.execute(
+                "create table %s (id %s not null primary key)" % (table, kind)
+            )
+            try:
+                self.load_keys(cursor, table, keys)
+                df = pd.concat(
+                    list(self.query_to_dfs(cursor, sql, params or {})),
+                    ignore_index=True,
+                )
+            except Exception:
+                try:
+                    cursor.execute(drop)
+                except (DatabaseError, InterfaceError) as e:
+                    logger.warning(e)
+                raise
+            cursor.execute(drop)
+            return df
+
+    @classmethod
+    def load_keys(cls, cursor, table: str, keys: list) -> None:
+        """Load keys into the temp table of cursor's connection.
+
+        Uses bulk copy, or with pymssql before 2.2.8, multi-row inserts
+            of at most 1000 rows each.
+        """
+        bulk_copy = getattr(cursor.connection, "bulk_copy", None)
+        if bulk_copy is not None:
+            bulk_copy(table, [(each,) for each in keys], batch_size=10000)
+            return
+        for start in range(0, len(keys), 1000):
+            end = start + 1000
+            values = keys[start:end]
+            cursor.execute(
+                "insert into %s (id) values " % table
+                + ", ".join(["(%s)"] * len(values)),
+                tuple(values),
+            )
+
+    def keys_batches_to_df(
+        self, query: str, keys: list, params: dict = None, chunk=KEYS_CHUNK
+    ) -> pd.DataFrame:
+        """Query to dataframe in concurrent chunks of keys."""
+        sql = query.replace(
+            KEYS, ", ".join("%%(_k%d)s" % i for i in range(chunk))
+        )
+        if not keys:
+            keys = [None]  # in (null): no rows, but the columns
+        chunks = []
+        for start in range(0, len(keys), chunk):
+            end = start + chunk
+            values = keys[start:end]
+            values += values[-1:] * (chunk - len(values))
+            chunks.append(
+                {
+                    **(params or {}),
+                    **{"_k%d" % i: each for i, each in enumerate(values)},
+                }
+            )
+        workers = max(1, min(len(chunks), self.uri.pool.size))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            dfs = list(executor.map(partial(self.chunk_to_df, sql), chunks))
+        return pd.concat(dfs, ignore_index=True)
+
+    @retry_on_operational_error()
+    def chunk_to_df(self, sql: str, params: dict) -> pd.DataFrame:
+        """Query one chunk of keys to dataframe on a pooled connection."""
+        with self.rollback() as cursor:
+            return self.query_to_df(cursor, sql, params)
 
     @contextmanager
     def rollback(self) -> None:
@@ -267,26 +871,60 @@ class Input(Configurable):  # pylint: disable=abstract-method
     def ping(self) -> bool:
         """Ping mssql on startup."""
         with self.uri.rollback() as cursor:
-            return self.uri.ping(cursor) and self.select_from_tables(cursor)
+            if not self.uri.ping(cursor):
+                return False
+        return self.select_from_tables()
 
-    @retry_on_operational_error()
-    def select_from_tables(self, cursor) -> bool:
+    def select_from_tables(self) -> bool:
         """Select."""
-        failures = []
-        for each in self.tables:
-            try:
-                sql = """
+        report = self.probe_tables()
+        logger.info('{"mssql.tables": %s}', dumps(report))
+        return all(each["ok"] for each in report.values())
+
+    def probe_tables(self) -> dict:
+        """Probe tables concurrently over pooled connections.
+
+        Return {table: {"ok": bool, "latency": seconds}}.
+        """
+        if not self.tables:
+            return {}
+        workers = max(1, min(len(self.tables), self.uri.pool.size))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                each: executor.submit(self._timed_probe_table, each)
+                for each in self.tables
+            }
+            return {each: future.result() for each, future in futures.items()}
+
+    def _timed_probe_table(self, table: str) -> dict:
+        """Return probe result and latency for table."""
+        start = monotonic()
+        try:
+            ok = self.probe_table(table)
+        except (DatabaseError, InterfaceError) as e:
+            logger.warning(e)
+            ok = False
+        return {"latency": round(monotonic() - start, 6), "ok": ok}
+
+    @retry_on_operational_error()
+    def probe_table(self, table: str) -> bool:
+        """Probe table."""
+        sql = """
 select 1 as n where exists (select 1 as n from %s)""" % (
-                    each,
-                )
+            table,
+        )
+        try:
+            with self.uri.rollback() as cursor:
                 cursor.execute(sql)
                 for _ in cursor.fetchall():
                     pass
-            except (DatabaseError, InterfaceError) as e:
-                logger.warning(e)
-                logger.warning(sql)
-                number, *_ = e.args
-                if number == 230:  # column privileges
-                    continue
-                failures.append(each)
-        return not bool(failures)
+        except OperationalError:
+            raise
+        except (DatabaseError, InterfaceError) as e:
+            logger.warning(e)
+            logger.warning(sql)
+            number, *_ = e.args
+            if number == 230:  # column privileges
+                return True
+            return False
+        return True
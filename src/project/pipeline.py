@@ -0,0 +1,235 @@
+"""Pipeline."""
+
+from __future__ import annotations
+
+from argparse import Namespace
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from json import dumps
+from logging import getLogger
+from queue import Empty, Full, Queue
+from threading import Event, Thread
+from time import perf_counter
+from typing import Callable, Iterable
+
+from .configurable import Configurable
+from .constants import PIPELINE_POLL, PIPELINE_QUEUE_SIZE
+
+logger = getLogger(__name__)
+
+DONE = object()
+
+
+class Stopped(Exception):
+    """Stopped because another stage failed."""
+
+
+class Stage:  # pylint: disable=too-few-public-methods
+    """Stage.
+
+    Metrics of one pipeline stage: items handled, seconds busy, and
+        seconds blocked on its queues (starved or back-pressured).
+    """
+
+    def __init__(self, name: str) -> None:
+        """Initialize stage."""
+        self.name = name
+        self.items = 0
+        self.busy = 0.0
+        self.blocked = 0.0
+
+    def report(self, elapsed: float) -> dict:
+        """Return metrics."""
+        return {
+            "blocked": round(self.blocked, 6),
+            "busy": round(self.busy, 6),
+            "items": self.items,
+            "throughput": round(self.items / elapsed, 6) if elapsed else None,
+        }
+
+
+class Pipeline(Configurable):
+    """Pipeline.
+
+    Run read -> process -> write concurrently over micro-batches,
+        so databases are not idle during prediction and the cpu is not
+        idle during database i/o:
+
+    model:
+      pipeline:
+        queue_size: 2  # micro-batches buffered between stages
+        processes: 0  # > 0 runs process in a pool of processes
+
+    Read and write run in threads. Process runs in the calling thread,
+        or in a process pool when processes > 0, in which case process
+        and its batches must be picklable.
+    Bounded queues between stages apply back-pressure: a fast reader
+        blocks instead of buffering the whole cohort, so queue_size must
+        be at least 1 (a Queue of size 0 is unbounded).
+    The first exception in any stage stops every stage and is raised.
+    """
+
+    @classmethod
+    def from_cfg(cls, cfg: dict) -> Pipeline:
+        """Return pipeline from cfg."""
+        kwargs = {
+            key: from_cfg(cfg[key])
+            for key, from_cfg in (("queue_size", int), ("processes", int))
+            if cfg.get(key) is not None
+        }
+        return cls(**kwargs)
+
+    @classmethod
+    def patch_args(cls, args: Namespace, cfg: dict) -> dict:
+        """Patch args into cfg."""
+        return cfg
+
+    def __init__(
+        self, queue_size: int = PIPELINE_QUEUE_SIZE, processes: int = 0
+    ) -> None:
+        """Initialize pipeline."""
+        if queue_size < 1:
+            raise ValueError("Pipeline queue_size must be >= 1")
+        if processes < 0:
+            raise ValueError("Pipeline processes must be >= 0")
+        self.queue_size = queue_size
+        self.processes = processes
+
+    def __call__(
+        self, read: Iterable, process: Callable, write: Callable
+    ) -> dict:
+        """Run pipeline, return stage metrics."""
+        stages = [Stage(name) for name in ("read", "process", "write")]
+        processing, writing = Queue(self.queue_size), Queue(self.queue_size)
+        stop, errors = Event(), []
+        threads = [
+            Thread(
+                target=self._guard,
+                args=(self._read, stop, errors, read, processing, stages[0]),
+                daemon=True,
+            ),
+            Thread(
+                target=self._guard,
+                args=(self._write, stop, errors, writing, write, stages[2]),
+                daemon=True,
+            ),
+        ]
+        start = perf_counter()
+        for each in threads:
+            each.start()
+        self._guard(
+            self._process,
+            stop,
+            errors,
+            processing,
+            process,
+            writing,
+            stages[1],
+        )
+        for each in threads:
+            each.join()
+        elapsed = perf_counter() - start
+        report = {each.name: each.report(elapsed) for each in stages}
+        report["seconds"] = round(elapsed, 6)
+        logger.info('{"pipeline": %s}', dumps(report))
+        if errors:
+            raise errors[0]
+        return report
+
+    @classmethod
+    def _guard(cls, func, stop: Event, errors: list, *args) -> None:
+        """Run stage, on failure record the error and stop all stages."""
+        try:
+            func(stop, *args)
+        except Stopped:
+            pass
+        except BaseException as e:  # pylint: disable=broad-except
+            errors.append(e)
+            stop.set()
+
+    @classmethod
+    def _get(cls, queue: Queue, stop: Event, stage: Stage) -> object:
+        """Get from queue, waiting while no stage failed."""
+        start = perf_counter()
+        while not stop.is_set():
+            try:
+                item = queue.get(timeout=PIPELINE_POLL)
+                stage.blocked += perf_counter() - start
+                return item
+            except Empty:
+                continue
+        raise Stopped()
+
+    @classmethod
+    def _put(cls, queue: Queue, item, stop: Event, stage: Stage) -> None:
+        """Put on queue, waiting while no stage failed."""
+        start = perf_counter()
+        while not stop.is_set():
+            try:
+                queue.put(item, timeout=PIPELINE_POLL)
+                stage.blocked += perf_counter() - start
+                return
+            except Full:
+                continue
+        raise Stopped()
+
+    @classmethod
+    def _read(cls, stop: Event, read, processing, stage: Stage) -> None:
+        """Read micro-batches into the processing queue."""
+        iterator = iter(read)
+        while True:
+            start = perf_counter()
+            batch = next(iterator, DONE)
+            if batch is DONE:
+                break
+            stage.busy += perf_counter() - start
+            stage.items += 1
+            cls._put(processing, batch, stop, stage)
+        cls._put(processing, DONE, stop, stage)
+
+    def _process(  # pylint: disable=too-many-arguments
+        self, stop: Event, processing, process, writing, stage: Stage
+    ) -> None:
+        """Process micro-batches from processing into writing."""
+        if self.processes <= 0:
+            while True:
+                batch = self._get(processing, stop, stage)
+                if batch is DONE:
+                    break
+                start = perf_counter()
+                result = process(batch)
+                stage.busy += perf_counter() - start
+                stage.items += 1
+                self._put(writing, result, stop, stage)
+            self._put(writing, DONE, stop, stage)
+            return
+
+        pending = deque()
+        with ProcessPoolExecutor(max_workers=self.processes) as executor:
+            done = False
+            while not done or pending:
+                if not done and len(pending) < self.processes:
+                    batch = self._get(processing, stop, stage)
+                    if batch is DONE:
+                        done = True
+                    else:
+                        pending.append(executor.submit(process, batch))
+                    continue
+                start = perf_counter()  # busy waiting on the workers
+                result = pending.popleft().result()
+                stage.busy += perf_counter() - start
+                stage.items += 1
+                self._put(writing, result, stop, stage)
+        self._put(writing, DONE, stop, stage)
+
+    @classmethod
+    def _write(cls, stop: Event, writing, write, stage: Stage) -> None:
+        """Write micro-batches from the writing queue."""
+        while True:
+            batch = cls._get(writing, stop, stage)
+            if batch is DONE:
+                break
+            start = perf_counter()
+            write(batch)
+            stage.busy += perf_counter() - start
+            stage.items += 1
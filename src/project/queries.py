@@ -0,0 +1,148 @@
+"""Queries."""
+
+from __future__ import annotations
+
+from argparse import Namespace
+from logging import getLogger
+from os import listdir
+from os.path import join, splitext
+from re import IGNORECASE, MULTILINE, compile as re_compile
+
+from .configurable import Configurable
+from .constants import ENCODING
+
+logger = getLogger(__name__)
+
+HEADER = re_compile(r"^\s*--\s*parameters:(.*)$", IGNORECASE | MULTILINE)
+PARAMETER = re_compile(r"@(\w+)\s+(\w+(?:\s*\([^)]*\))?)")
+
+
+class Query:
+    """Query.
+
+    A named sql statement, with parameters declared in its header:
+
+    -- parameters: @from_id bigint, @to_id bigint
+    select id, patient_id, value
+    from labs
+    where id > @from_id and id <= @to_id
+
+    The statement runs through sp_executesql with typed parameters, so
+        the text sent is the same for every call and sql server reuses
+        one cached plan instead of compiling a plan per literal.
+    Bound values are still sent by pymssql as escaped literals of the
+        outer exec, never spliced into the statement.
+    """
+
+    def __init__(self, name: str, sql: str) -> None:
+        """Initialize query."""
+        self.name = name
+        self.sql = sql
+        self.parameters = tuple(
+            (match.group(1), match.group(2))
+            for header in HEADER.findall(sql)
+            for match in PARAMETER.finditer(header)
+        )
+        names = [each for each, _ in self.parameters]
+        if len(set(names)) != len(names):
+            raise ValueError("Query %s declares a duplicate parameter" % name)
+        self.text = self.compile()
+
+    def compile(self) -> str:
+        """Return the sp_executesql text in pymssql pyformat style."""
+        if not self.parameters:
+            return self.sql
+        statement = self.sql.replace("'", "''").replace("%", "%%")
+        declarations = ", ".join(
+            "@%s %s" % (name, kind) for name, kind in self.parameters
+        )
+        values = ", ".join(
+            "@%s = %%(%s)s" % (name, name) for name, _ in self.parameters
+        )
+        return "exec sp_executesql N'%s', N'%s', %s" % (
+            statement,
+            declarations,
+            values,
+        )
+
+    def bind(self, params: dict = None) -> dict:
+        """Return params for text, raise ValueError unless they match."""
+        if params is None:
+            params = {}
+        declared = {name for name, _ in self.parameters}
+        missing = declared - set(params)
+        unexpected = set(params) - declared
+        if missing or unexpected:
+            raise ValueError(
+                "Query %s missing %s, unexpected %s"
+                % (self.name, sorted(missing), sorted(unexpected))
+            )
+        for key, value in params.items():
+            if isinstance(value, (list, set, tuple)):
+                raise ValueError(
+                    "Query %s parameter %s is a collection" % (self.name, key)
+                )
+        return params or None
+
+    def __repr__(self) -> str:
+        """Return repr."""
+        return "Query(%r)" % self.name
+
+
+class Queries(Configurable):
+    """Queries.
+
+    Registry of named queries, one per .sql file, loaded once:
+
+    input:
+      queries: ./sql  # labs.sql is queries["labs"]
+
+    with self.rollback() as cursor:
+        df = self.registered_query_to_df(
+            cursor, "labs", {"from_id": from_id, "to_id": to_id}
+        )
+    """
+
+    @classmethod
+    def from_cfg(cls, cfg) -> Queries:
+        """Return queries from cfg."""
+        if isinstance(cfg, str):
+            cfg = {"path": cfg}
+        return cls.load(cfg["path"])
+
+    @classmethod
+    def patch_args(cls, args: Namespace, cfg: dict) -> dict:
+        """Patch args into cfg."""
+        return cfg
+
+    @classmethod
+    def load(cls, path: str) -> Queries:
+        """Return queries of the .sql files in path."""
+        queries = {}
+        for file_name in sorted(listdir(path)):
+            name, extension = splitext(file_name)
+            if extension.lower() != ".sql":
+                continue
+            with open(join(path, file_name), encoding=ENCODING) as fin:
+                queries[name] = Query(name, fin.read())
+        logger.info(
+            '{"mssql.queries": {"path": "%s", "count": %d}}',
+            path,
+            len(queries),
+        )
+        return cls(queries)
+
+    def __init__(self, queries: dict) -> None:
+        """Initialize queries."""
+        self.queries = queries
+
+    def __getitem__(self, name: str) -> Query:
+        """Return query name."""
+        try:
+            return self.queries[name]
+        except KeyError:
+            raise KeyError("No query %s" % name) from None
+
+    def __contains__(self, name: str) -> bool:
+        """Return True when query name is registered."""
+        return name in self.queries
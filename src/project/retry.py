@@ -0,0 +1,316 @@
+"""Retry."""
+
+from __future__ import annotations
+
+from asyncio import iscoroutinefunction, sleep as asleep
+from collections import Counter
+from functools import wraps
+from json import dumps
+from logging import getLogger
+from random import uniform
+from threading import Lock
+from time import monotonic, sleep as block
+from typing import Callable
+
+from .constants import (
+    BACKOFF,
+    BACKOFF_CAP,
+    BREAKER_RESET,
+    BREAKER_THRESHOLD,
+    RETRIES,
+    RETRY_BUDGET,
+)
+
+logger = getLogger(__name__)  # pylint: disable=invalid-name
+
+COUNTERS = {}
+_LOCK = Lock()
+
+
+def count(name: str, event: str) -> None:
+    """Increment the event counter of policy name."""
+    with _LOCK:
+        COUNTERS.setdefault(name, Counter())[event] += 1
+
+
+def counters() -> dict:
+    """Return a copy of the counters of every policy by name.
+
+    Events are calls, successes, retries, failures, exhausted (retries
+        or budget used up), permanent (not retried), opened (circuit
+        opened) and rejected (failed fast while the circuit was open).
+    """
+    with _LOCK:
+        return {name: dict(each) for name, each in COUNTERS.items()}
+
+
+class CircuitOpen(Exception):
+    """Failed fast because the circuit breaker is open."""
+
+
+class Breaker:
+    """Breaker.
+
+    Circuit breaker shared by every unit of work against one database.
+
+    After threshold consecutive transient failures the circuit opens,
+        and calls fail fast with CircuitOpen for reset seconds instead of
+        piling retries onto a server that is failing over.
+    Then one trial call is let through (half open): success closes the
+        circuit, failure opens it again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        threshold: int = BREAKER_THRESHOLD,
+        reset: float = BREAKER_RESET,
+    ) -> None:
+        """Initialize breaker."""
+        self.name = name
+        self.threshold = threshold
+        self.reset = reset
+        self.failures = 0
+        self.opened = None
+        self._trial = False
+        self._lock = Lock()
+
+    def admit(self) -> tuple:
+        """Return (allowed, trial) for a call.
+
+        Trial is True for the one call let through while half open.
+        """
+        with self._lock:
+            if self.opened is None:
+                return True, False
+            if self._trial or monotonic() - self.opened < self.reset:
+                return False, False
+            self._trial = True
+            return True, True
+
+    def allow(self) -> bool:
+        """Return True when a call may proceed."""
+        allowed, _ = self.admit()
+        return allowed
+
+    def release(self) -> None:
+        """End a trial that raised neither success nor a failure.
+
+        The circuit stays open and the next call is the next trial.
+        """
+        with self._lock:
+            self._trial = False
+
+    def success(self) -> None:
+        """Close the circuit."""
+        with self._lock:
+            self.failures = 0
+            self.opened = None
+            self._trial = False
+
+    def failure(self) -> None:
+        """Record a transient failure, opening the circuit at threshold."""
+        with self._lock:
+            self.failures += 1
+            if not self._trial and self.failures < self.threshold:
+                return
+            self.opened = monotonic()
+            self._trial = False
+        count(self.name, "opened")
+        logger.warning(
+            '{"retry.breaker": {"name": "%s", "state": "open"}}', self.name
+        )
+
+
+class Breakers:  # pylint: disable=too-few-public-methods
+    """Breakers.
+
+    Circuit breakers of one backend, one per database, created on first
+        use. Key returns the database of a unit of work from its args,
+        for example "host/database" from self.uri.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        key: Callable,
+        threshold: int = BREAKER_THRESHOLD,
+        reset: float = BREAKER_RESET,
+    ) -> None:
+        """Initialize breakers."""
+        self.name = name
+        self.key = key
+        self.threshold = threshold
+        self.reset = reset
+        self.breakers = {}
+        self._lock = Lock()
+
+    def __call__(self, args: tuple) -> Breaker:
+        """Return the breaker of the database of args."""
+        key = self.key(args)
+        with self._lock:
+            breaker = self.breakers.get(key)
+            if breaker is None:
+                name = self.name if key is None else "%s:%s" % (self.name, key)
+                breaker = self.breakers[key] = Breaker(
+                    name, self.threshold, self.reset
+                )
+            return breaker
+
+
+class Retry:  # pylint: disable=too-many-instance-attributes
+    """Retry.
+
+    Retry policy shared by the mongo and mssql retry decorators:
+
+    @Retry("mongo", (AutoReconnect,))
+    def unit_of_work(...):
+        ...
+
+    Exceptions of the transient types, for which is_permanent is not
+        True, are retried up to retries times, sleeping a random
+        delay in [0, min(cap, backoff * 2 ** attempt)] (full jitter)
+        so clients do not retry in lockstep.
+    No retry starts after budget seconds since the first attempt.
+    Every attempt goes through breaker, when there is one, or through
+        the breaker of its database from Breakers.
+    Coroutine functions are awaited and sleep without blocking the
+        event loop.
+    See counters() for retry storms, for example during failover.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        name: str,
+        transient: tuple,
+        is_permanent: Callable = None,
+        retries: int = RETRIES,
+        backoff: float = BACKOFF,
+        cap: float = BACKOFF_CAP,
+        budget: float = RETRY_BUDGET,
+        breaker=None,
+    ) -> None:
+        """Initialize retry policy."""
+        self.name = name
+        self.transient = transient
+        self.is_permanent = is_permanent
+        self.retries = retries
+        self.backoff = backoff
+        self.cap = cap
+        self.budget = budget
+        self.breaker = breaker
+
+    def __call__(self, func: Callable) -> Callable:
+        """Return func wrapped with the policy."""
+        if iscoroutinefunction(func):
+            return self.wrap_async(func)
+        return self.wrap(func)
+
+    def wrap_async(self, func: Callable) -> Callable:
+        """Return coroutine function func wrapped with the policy."""
+
+        @wraps(func)
+        async def wrapped(*args, **kwargs):
+            """Return coroutine result."""
+            breaker = self.breaker_of(args)
+            start, attempt = monotonic(), 0
+            while True:
+                trial = self.before(attempt, breaker)
+                try:
+                    result = await func(*args, **kwargs)
+                except self.transient as e:
+                    await asleep(
+                        self.after_failure(e, attempt, start, breaker)
+                    )
+                    attempt += 1
+                    continue
+                except BaseException:
+                    if trial:
+                        breaker.release()
+                    raise
+                self.after_success(breaker)
+                return result
+
+        return wrapped
+
+    def wrap(self, func: Callable) -> Callable:
+        """Return func wrapped with the policy."""
+
+        @wraps(func)
+        def wrapped(*args, **kwargs):
+            """Return method result."""
+            breaker = self.breaker_of(args)
+            start, attempt = monotonic(), 0
+            while True:
+                trial = self.before(attempt, breaker)
+                try:
+                    result = func(*args, **kwargs)
+                except self.transient as e:
+                    block(self.after_failure(e, attempt, start, breaker))
+                    attempt += 1
+                    continue
+                except BaseException:
+                    if trial:
+                        breaker.release()
+                    raise
+                self.after_success(breaker)
+                return result
+
+        return wrapped
+
+    def delay(self, attempt: int) -> float:
+        """Return the jittered delay before retry attempt + 1."""
+        return uniform(0, min(self.cap, self.backoff * 2 ** attempt))
+
+    def breaker_of(self, args: tuple) -> Breaker:
+        """Return the breaker of a call with args, or None."""
+        if isinstance(self.breaker, Breakers):
+            return self.breaker(args)
+        return self.breaker
+
+    def before(self, attempt: int, breaker: Breaker) -> bool:
+        """Count the attempt, fail fast when the circuit is open.
+
+        Return True when the attempt is the breaker's half open trial.
+        """
+        count(self.name, "calls" if attempt == 0 else "retries")
+        if breaker is None:
+            return False
+        allowed, trial = breaker.admit()
+        if not allowed:
+            count(self.name, "rejected")
+            raise CircuitOpen(breaker.name)
+        return trial
+
+    def after_success(self, breaker: Breaker) -> None:
+        """Count success and close the circuit."""
+        count(self.name, "successes")
+        if breaker is not None:
+            breaker.success()
+
+    def after_failure(
+        self, error, attempt: int, start: float, breaker: Breaker
+    ) -> float:
+        """Return delay before the next attempt, or raise error."""
+        if self.is_permanent is not None and self.is_permanent(error):
+            count(self.name, "permanent")
+            if breaker is not None:
+                breaker.success()  # the server is up and answered
+            raise error
+        count(self.name, "failures")
+        if breaker is not None:
+            breaker.failure()
+        delay = self.delay(attempt)
+        elapsed = monotonic() - start
+        if attempt >= self.retries or elapsed + delay > self.budget:
+            count(self.name, "exhausted")
+            raise error
+        logger.warning(
+            '{"retry": {"name": "%s", "attempt": %d, "delay": %f, '
+            '"error": %s}}',
+            self.name,
+            attempt + 1,
+            delay,
+            dumps(repr(error)),
+        )
+        return delay
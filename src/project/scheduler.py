@@ -0,0 +1,129 @@
+"""Scheduler."""
+
+from __future__ import annotations
+
+from argparse import Namespace
+from collections import deque
+from datetime import datetime, timezone
+from json import dumps
+from logging import getLogger
+from threading import Lock
+from time import perf_counter, process_time
+from time import sleep as block
+
+from schedule import Scheduler as Schedule
+
+from .configurable import Configurable
+from .constants import SCHEDULE_HISTORY
+
+logger = getLogger(__name__)
+
+
+class Scheduler(Configurable):
+    """Scheduler.
+
+    Run a service repeatedly in one long-running process, so
+        interpreter startup, imports, configuration and model loading
+        are paid once instead of once per run.
+
+    Interval trigger:
+
+    schedule:
+      every: 15
+      unit: minutes  # seconds, minutes, hours, days, weeks
+
+    Cron-like trigger, at a time of day or on a weekday:
+
+    schedule:
+      unit: monday  # days, monday .. sunday, or hours with at: ":15"
+      at: "10:30"
+      now: true  # also run once on startup
+
+    A top-level scheduled_time: "10:30" without a schedule section
+        is a daily trigger.
+
+    Runs never overlap: the next run is scheduled from the end of the
+        previous one, and a run requested while another is in progress
+        is skipped.
+    """
+
+    @classmethod
+    def from_cfg(cls, cfg: dict) -> Scheduler:
+        """Return scheduler from service cfg."""
+        schedule = cfg.get("schedule")
+        if schedule is None:
+            at = cfg.get("scheduled_time")
+            if at is None:
+                raise ValueError("Missing schedule or scheduled_time")
+            schedule = {"at": at, "unit": "days"}
+        kwargs = {
+            key: from_cfg(schedule[key])
+            for key, from_cfg in (
+                ("every", int),
+                ("unit", str),
+                ("at", str),
+                ("now", bool),
+            )
+            if key in schedule
+        }
+        return cls(**kwargs)
+
+    @classmethod
+    def patch_args(cls, args: Namespace, cfg: dict) -> dict:
+        """Patch args into cfg."""
+        return cfg
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        every: int = 1,
+        unit: str = "days",
+        at: str = None,
+        now: bool = False,
+        history: int = SCHEDULE_HISTORY,
+    ) -> None:
+        """Initialize scheduler."""
+        self.schedule = Schedule()
+        job = getattr(self.schedule.every(every), unit)
+        if at is not None:
+            job = job.at(at)
+        self.job = job
+        self.now = now
+        self.runs = deque(maxlen=history)
+        self._lock = Lock()
+
+    def __call__(self, func) -> None:
+        """Run func on schedule until the process is stopped."""
+        self.job.do(self.run, func)
+        logger.info('{"scheduler.next": "%s"}', self.job.next_run)
+        if self.now:
+            self.run(func)
+        while True:
+            self.schedule.run_pending()
+            idle = self.schedule.idle_seconds
+            block(1.0 if idle is None else min(max(idle, 0.0), 60.0))
+
+    def run(self, func) -> dict:
+        """Run func once unless a run is in progress, return its timing."""
+        if not self._lock.acquire(blocking=False):
+            logger.warning('{"scheduler.run": "skipped, already running"}')
+            return None
+        try:
+            started = datetime.now(timezone.utc)
+            wall, cpu = perf_counter(), process_time()
+            ok = True
+            try:
+                func()
+            except Exception:  # pylint: disable=broad-except
+                logger.exception('{"scheduler.run": "failed"}')
+                ok = False
+            run = {
+                "cpu": round(process_time() - cpu, 6),
+                "ok": ok,
+                "seconds": round(perf_counter() - wall, 6),
+                "started": started.isoformat(),
+            }
+        finally:
+            self._lock.release()
+        self.runs.append(run)
+        logger.info('{"scheduler.run": %s}', dumps(run))
+        return run
@@ -4,36 +4,33 @@ from __future__ import annotations
 
 import logging
 from argparse import ArgumentParser, Namespace
-from functools import wraps
-from gc import collect
 from os import getenv
 from pickle import load
 from sys import argv as sys_argv
 from sys import stdout
 
-from yaml import safe_load as yaml_loads
-
+from .config import load as load_cfg
 from .configurable import Configurable
+from .health import Health
+from .scheduler import Scheduler
+from .telemetry import flush, span
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    stream=stdout,
-)
 logger = logging.getLogger(__name__)
 
+PARSERS = {}
 
-def garbage_collection(func):
-    """Garbage collection decorator."""
 
-    @wraps(func)
-    def _wrapper(*args, **kwargs):
-        try:
-            return func(*args, **kwargs)
-        finally:
-            collect()
+def basic_config() -> None:
+    """Configure logging, once, in console script entry points.
 
-    return _wrapper
+    Modules only get their loggers, so importing project leaves
+        logging to the importer.
+    """
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        stream=stdout,
+    )
 
 
 def unpickle_from_file(file_name):
@@ -57,17 +54,31 @@ class Service(Configurable):
 
     DESCRIPTION = "Service"
 
+    REQUIRED = ()
+
     @classmethod
     def cfg_from_args(cls, args: Namespace) -> dict:
         """Return cfg from args."""
         key = args.configuration
         assert key is not None
 
-        with open(key) as fin:
-            cfg = yaml_loads(fin.read())
+        cfg = load_cfg(key, cls.validate)
 
-        cls.patch_args(cfg, args)
-        return cfg
+        return cls.patch_args(args, cfg)
+
+    @classmethod
+    def validate(cls, cfg: dict) -> None:
+        """Raise ValueError when the cfg file is invalid.
+
+        Called once per distinct file content, see config.load.
+        """
+        if not isinstance(cfg, dict):
+            raise ValueError("Configuration must be a mapping")
+        missing = [key for key in cls.REQUIRED if key not in cfg]
+        if missing:
+            raise ValueError(
+                "Configuration is missing: %s" % ", ".join(missing)
+            )
 
     @classmethod
     def from_argv(cls, argv) -> Service:
@@ -85,21 +96,48 @@ class Service(Configurable):
 
         See setup.py entry point.
         """
+        basic_config()
         i = cls.from_argv(sys_argv[1:])
         i()
 
+    @classmethod
+    def main_scheduled(cls) -> None:
+        """Main scheduled.
+
+        Build the service once and run it on the configured schedule.
+
+        See setup.py entry point and Scheduler.
+        """
+        basic_config()
+        cfg = cls.cfg_from_args(cls.parse_args(sys_argv[1:]))
+        scheduler = Scheduler.from_cfg(cfg)
+        i = cls.from_cfg(cfg)
+        scheduler(i)
+
     @classmethod
     def main_ping(cls) -> None:
         """Main ping.
 
         See setup.py entry_point.
         """
+        basic_config()
         i = cls.from_argv(sys_argv[1:])
         i.ping()
 
     @classmethod
     def parse_args(cls, argv: list) -> Namespace:
-        """Return parsed args from command line and environment variables."""
+        """Return parsed args from command line and environment variables.
+
+        The parser is built once per class.
+        """
+        parser = PARSERS.get(cls)
+        if parser is None:
+            parser = PARSERS[cls] = cls.parser()
+        return parser.parse_args(argv)
+
+    @classmethod
+    def parser(cls) -> ArgumentParser:
+        """Return parser of ARGS, with defaults from the environment."""
         parser = ArgumentParser(description=cls.DESCRIPTION)
         for key, kwargs in cls.ARGS.items():
             env, arg = key
@@ -108,9 +146,9 @@ class Service(Configurable):
                 nargs = kwargs.get("nargs")
                 if nargs not in ("?", None):
                     default = default.split()
-                kwargs["default"] = default
+                kwargs = {**kwargs, "default": default}
             parser.add_argument(arg, **kwargs)
-        return parser.parse_args(argv)
+        return parser
 
     @classmethod
     def patch_args(cls, args: Namespace, cfg: dict) -> dict:
@@ -152,27 +190,60 @@ class SimpleService(Service):  # pylint: disable=abstract-method
         are not strong Data Models.
     """
 
-    def __init__(self, inputs, outputs, model) -> None:
-        """Init."""
+    def __init__(  # pylint: disable=too-many-arguments
+        self, inputs, outputs, model, health=None, shards=None
+    ) -> None:
+        """Init.
+
+        With shards, each run is split across worker processes by a
+            stable hash of a key of the cohort, see Shards.
+        """
         self.inputs = inputs
         self.outputs = outputs
         self.model = model
+        self.health = Health() if health is None else health
+        self.shards = shards
 
-    def ping(self) -> None:
+    def ping(self) -> dict:
         """Ping.
 
         Throw an unhandled exception when configuration, dependencies,
             or secrets are wrong or an upstream/downstream component
             is unavailable.
+
+        Model, outputs, and inputs are pinged concurrently, see Health.
         """
-        self.model.ping()
-        self.outputs.ping()
-        self.inputs.ping()
+        return self.health(
+            {
+                "model": self.model.ping,
+                "outputs": self.outputs.ping,
+                "inputs": self.inputs.ping,
+            }
+        )
 
     def __call__(self) -> None:
         """Run.
 
-        Delegate to ping and then run the model.
+        Delegate to ping, unless the last ping is fresh, and then run
+            the model.
+        Input watermarks, if any, are committed after the outputs are
+            written, so a failed run is read again.
+        Spans of the run are flushed to telemetry hooks at the end.
         """
-        self.ping()
-        self.model(self.inputs, self.outputs)
+        try:
+            with span("service"):
+                if not self.health.fresh():
+                    self.ping()
+                if self.shards is None:
+                    self.model(self.inputs, self.outputs)
+                    self.commit()
+                else:
+                    self.shards(self)
+        finally:
+            flush()
+
+    def commit(self, values: dict = None) -> None:
+        """Commit input watermarks, when inputs have them."""
+        commit = getattr(self.inputs, "commit", None)
+        if commit is not None:
+            commit(values)
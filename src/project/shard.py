@@ -0,0 +1,266 @@
+"""Shard."""
+
+from __future__ import annotations
+
+from argparse import Namespace
+from concurrent.futures import ProcessPoolExecutor
+from json import dumps
+from logging import getLogger
+from multiprocessing import get_context
+from os import getenv
+from time import perf_counter
+
+from .configurable import Configurable
+from .lazy import lazy_import
+from .telemetry import recording, replay
+
+logger = getLogger(__name__)
+
+pd = lazy_import("pandas")  # pylint: disable=invalid-name
+
+CURRENT = None
+SCOPE = None
+SERVICE = None
+
+
+def current() -> Shard:
+    """Return the shard of this worker process, None when not sharded."""
+    return CURRENT
+
+
+def scope() -> tuple:
+    """Return (allocation, allocations) of a sharded run, else None."""
+    return SCOPE
+
+
+class Shard:
+    """Shard.
+
+    One of count shards of a cohort split by a stable hash of key.
+
+    The hash is pandas' hash_pandas_object of the normalized key, which
+        is stable across processes, hosts, python runs (unlike hash())
+        and dtypes, so a patient is always in the same shard.
+    """
+
+    def __init__(self, index: int, count: int, key: str) -> None:
+        """Initialize shard."""
+        self.index = index
+        self.count = count
+        self.key = key
+
+    @classmethod
+    def normalize(cls, values) -> object:
+        """Return values as strings, the same whatever their dtype.
+
+        The hash depends on dtype, so keys are hashed as text, with whole
+            floats (ids promoted by nulls) written as integers: 42, 42.0
+            and "42" are the same key.
+        """
+        series = pd.Series(values)
+        if series.dtype.kind == "f":
+            if (series.dropna() % 1 == 0).all():
+                series = series.astype("Int64")
+        elif series.dtype.kind == "O":
+            series = series.map(cls.whole)
+        return series.astype(str)
+
+    @classmethod
+    def whole(cls, value) -> object:
+        """Return a whole float value as an int, other values as is."""
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+        return value
+
+    def mask(self, values) -> object:
+        """Return boolean array, True for values in this shard."""
+        hashes = pd.util.hash_pandas_object(
+            self.normalize(values), index=False
+        )
+        return (hashes.to_numpy() % self.count) == self.index
+
+    def filter(self, df) -> object:
+        """Return rows of df whose key is in this shard."""
+        return df[self.mask(df[self.key].to_numpy())]
+
+    def __repr__(self) -> str:
+        """Return repr."""
+        return "Shard(%d, %d, %r)" % (self.index, self.count, self.key)
+
+
+class Shards(Configurable):
+    """Shards.
+
+    Run inputs -> model -> outputs once per shard of the cohort, in a
+        pool of forked worker processes:
+
+    shards:
+      key: patient_id
+      count: 8  # shards across all allocations
+      processes: 2  # worker processes in this allocation
+      allocations: 1  # nomad group count
+      allocation: 0  # defaults to NOMAD_ALLOC_INDEX
+      merge: false  # true: write all shards at once from this process
+
+    Inputs select the cohort of the worker's shard:
+
+    shard = current()
+    if shard is not None:
+        cohort = shard.filter(cohort)
+
+    Allocation a runs shards a, a + allocations, ..., so the same
+        config with count = allocations * processes spreads a run
+        across the allocations of a nomad group.
+    Workers fork after the service is pinged, sharing read-only model
+        weights (see Artifacts) with the parent, and reopen their
+        own database connections (see CLIENTS and Pool).
+    With merge, workers return their predictions, which must be
+        dataframes, and outputs is called once with all of them.
+    Input watermarks read by the workers are committed once every shard
+        of the allocation succeeded, at the lowest value of each input.
+        With allocations > 1, each allocation keeps its own watermarks
+        (see Watermarks.key), so a failed allocation is read again even
+        when the others succeeded. Changing allocations starts new
+        watermarks from the lookback window.
+    Spans and gauges of the workers are replayed in the parent, which
+        flushes them (see Telemetry.replay).
+    """
+
+    @classmethod
+    def from_cfg(cls, cfg: dict) -> Shards:
+        """Return shards from cfg."""
+        kwargs = {
+            key: from_cfg(cfg[key])
+            for key, from_cfg in (
+                ("key", str),
+                ("count", int),
+                ("processes", int),
+                ("allocations", int),
+                ("allocation", int),
+                ("merge", bool),
+            )
+            if cfg.get(key) is not None
+        }
+        return cls(**kwargs)
+
+    @classmethod
+    def patch_args(cls, args: Namespace, cfg: dict) -> dict:
+        """Patch args into cfg."""
+        return cfg
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        key: str,
+        count: int,
+        processes: int = None,
+        allocations: int = 1,
+        allocation: int = None,
+        merge: bool = False,
+    ) -> None:
+        """Initialize shards."""
+        if allocation is None:
+            allocation = int(getenv("NOMAD_ALLOC_INDEX", "0"))
+        if not 0 <= allocation < allocations:
+            raise ValueError(
+                "Allocation %d is not in [0, %d)" % (allocation, allocations)
+            )
+        self.key = key
+        self.count = count
+        self.allocations = allocations
+        self.allocation = allocation
+        self.merge = merge
+        self.indexes = list(range(allocation, count, allocations))
+        self.processes = len(self.indexes) if processes is None else processes
+
+    @classmethod
+    def watermarks(cls, pending: list) -> dict:
+        """Return the lowest watermark of each input across shards."""
+        values = {}
+        for each in pending:
+            for name, value in each.items():
+                if name not in values or value < values[name]:
+                    values[name] = value
+        return values
+
+    def shards(self) -> list:
+        """Return the shards of this allocation."""
+        return [Shard(index, self.count, self.key) for index in self.indexes]
+
+    def __call__(self, service) -> list:
+        """Run the service's model once per shard of this allocation.
+
+        Return the seconds of each shard.
+        """
+        global SCOPE, SERVICE  # pylint: disable=global-statement
+        SCOPE, SERVICE = (self.allocation, self.allocations), service
+        try:
+            results = self.run()
+            frames = [each for _, batch, *_ in results for each in batch]
+            if frames:
+                service.outputs(pd.concat(frames, ignore_index=True))
+            service.commit(self.watermarks([each[2] for each in results]))
+        finally:
+            SCOPE, SERVICE = None, None
+        report = {
+            "allocation": self.allocation,
+            "seconds": [seconds for seconds, *_ in results],
+            "shards": self.indexes,
+        }
+        logger.info('{"shards": %s}', dumps(report))
+        return report["seconds"]
+
+    def run(self) -> list:
+        """Return the results of run_shard for each shard, in order.
+
+        Raise the first error after every shard finished.
+        """
+        results, errors = [], []
+        with ProcessPoolExecutor(
+            max_workers=max(1, self.processes),
+            mp_context=get_context("fork"),
+        ) as executor:
+            futures = [
+                executor.submit(run_shard, shard, self.merge)
+                for shard in self.shards()
+            ]
+            for future in futures:
+                try:
+                    result = future.result()
+                except Exception as e:  # pylint: disable=broad-except
+                    logger.exception(e)
+                    errors.append(e)
+                    continue
+                replay(result[3])
+                results.append(result)
+        if errors:
+            raise errors[0]
+        return results
+
+
+def run_shard(shard: Shard, merge: bool) -> tuple:
+    """Run the forked SERVICE's model for shard in a worker process.
+
+    Return seconds, the predictions when merging, the watermarks read
+        by the shard's inputs, committed by the parent once every shard
+        succeeded, and the spans and gauges of the shard, replayed by
+        the parent.
+    """
+    global CURRENT  # pylint: disable=global-statement
+    CURRENT = shard
+    predictions = []
+    outputs = predictions.append if merge else SERVICE.outputs
+    start = perf_counter()
+    try:
+        with recording() as recorder:
+            SERVICE.model(SERVICE.inputs, outputs)
+    finally:
+        CURRENT = None
+    seconds = perf_counter() - start
+    logger.info(
+        '{"shard": {"index": %d, "count": %d, "seconds": %f}}',
+        shard.index,
+        shard.count,
+        seconds,
+    )
+    pending = dict(getattr(SERVICE.inputs, "pending", {}))
+    return seconds, predictions, pending, recorder.records
@@ -0,0 +1,453 @@
+"""Telemetry."""
+
+from __future__ import annotations
+
+from argparse import Namespace
+from contextlib import contextmanager
+from functools import wraps
+from json import dumps
+from logging import getLogger
+from os import replace
+from socket import AF_INET, SOCK_DGRAM, socket
+from threading import Lock, local
+from time import perf_counter, thread_time
+from typing import Callable, Iterable
+from uuid import uuid4
+
+from .configurable import Configurable
+from .memory import rss
+
+logger = getLogger(__name__)
+
+
+def rows(value) -> int:
+    """Return rows of a df, or the sum of rows of a tuple of dfs, or None.
+
+    Only a tuple shape (numpy and pandas) counts: other objects answer
+        any attribute, a pymongo Collection returns the sub-collection
+        "shape", which raises on truth value testing.
+    """
+    shape = getattr(value, "shape", None)
+    if isinstance(shape, tuple):
+        return int(shape[0]) if shape else 1
+    if isinstance(value, (list, tuple)):
+        counts = [rows(each) for each in value]
+        if counts and all(each is not None for each in counts):
+            return sum(counts)
+    return None
+
+
+class Span:
+    """Span.
+
+    Wall seconds, cpu seconds of the calling thread, rows in and out,
+        and rss delta in bytes of one named unit of work.
+    Parent is the name of the enclosing span in the same thread.
+    """
+
+    # a plain record of one span's measures, read by the hooks
+    # pylint: disable=too-many-instance-attributes,too-few-public-methods
+
+    def __init__(self, name: str, parent: str = None, rows_in=None) -> None:
+        """Initialize span."""
+        self.name = name
+        self.parent = parent
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.error = None
+        self.wall = None
+        self.cpu = None
+        self.rss_delta = None
+
+    def as_dict(self) -> dict:
+        """Return span as a dict."""
+        return {
+            "cpu": self.cpu,
+            "error": self.error,
+            "name": self.name,
+            "parent": self.parent,
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "rss_delta": self.rss_delta,
+            "wall": self.wall,
+        }
+
+
+class JsonLog:
+    """JsonLog.
+
+    Log each span as a json line.
+    """
+
+    def __call__(self, record: Span) -> None:
+        """Log span."""
+        logger.info('{"span": %s}', dumps(record.as_dict()))
+
+    def gauge(self, metric: str, name: str, value) -> None:
+        """Log gauge."""
+        logger.info(
+            '{"gauge": %s}',
+            dumps({"metric": metric, "name": name, "value": value}),
+        )
+
+    def flush(self) -> None:
+        """Flush."""
+
+
+class Textfile:
+    """Textfile.
+
+    Aggregate spans by name into Prometheus text format metrics, written
+        atomically on flush for the node_exporter textfile collector:
+
+    project_span_count_total{name="model.predict"} 12
+    project_span_wall_seconds_total{name="model.predict"} 3.2
+    ...
+    project_batch_size{name="mssql.read"} 20000
+    """
+
+    REPLAY = True
+
+    COUNTERS = (
+        ("count", "Spans completed."),
+        ("errors", "Spans that raised."),
+        ("wall_seconds", "Wall seconds."),
+        ("cpu_seconds", "Cpu seconds of the calling thread."),
+        ("rows_in", "Rows in."),
+        ("rows_out", "Rows out."),
+    )
+
+    def __init__(self, path: str, prefix: str) -> None:
+        """Initialize textfile."""
+        self.path = path
+        self.prefix = prefix
+        self.metrics = {}
+        self.rss_delta = {}
+        self.gauges = {}
+        self._lock = Lock()
+
+    def __call__(self, record: Span) -> None:
+        """Add span to its metrics."""
+        with self._lock:
+            metrics = self.metrics.setdefault(
+                record.name, dict.fromkeys(key for key, _ in self.COUNTERS)
+            )
+            for key, value in (
+                ("count", 1),
+                ("errors", 1 if record.error else 0),
+                ("wall_seconds", record.wall),
+                ("cpu_seconds", record.cpu),
+                ("rows_in", record.rows_in),
+                ("rows_out", record.rows_out),
+            ):
+                if value is not None:
+                    metrics[key] = (metrics[key] or 0) + value
+            self.rss_delta[record.name] = record.rss_delta
+
+    def gauge(self, metric: str, name: str, value) -> None:
+        """Set gauge metric of name."""
+        with self._lock:
+            self.gauges.setdefault(metric, {})[name] = value
+
+    def flush(self) -> None:
+        """Write metrics atomically."""
+        lines = []
+        with self._lock:
+            for key, description in self.COUNTERS:
+                metric = "%s_span_%s_total" % (self.prefix, key)
+                lines.append("# HELP %s %s" % (metric, description))
+                lines.append("# TYPE %s counter" % metric)
+                for name, metrics in sorted(self.metrics.items()):
+                    if metrics[key] is not None:
+                        lines.append(
+                            '%s{name="%s"} %s' % (metric, name, metrics[key])
+                        )
+            metric = "%s_span_rss_delta_bytes" % self.prefix
+            lines.append("# HELP %s Rss delta of the last span." % metric)
+            lines.append("# TYPE %s gauge" % metric)
+            for name, value in sorted(self.rss_delta.items()):
+                lines.append('%s{name="%s"} %d' % (metric, name, value))
+            for key, gauges in sorted(self.gauges.items()):
+                metric = "%s_%s" % (self.prefix, key)
+                lines.append("# TYPE %s gauge" % metric)
+                for name, value in sorted(gauges.items()):
+                    lines.append('%s{name="%s"} %s' % (metric, name, value))
+        temporary = self.path + "." + uuid4().hex
+        with open(temporary, "w") as fout:
+            fout.write("\n".join(lines) + "\n")
+        replace(temporary, self.path)
+
+
+class Statsd:
+    """Statsd.
+
+    Send each span to a StatsD compatible daemon over udp:
+
+    project.model.predict.wall:3200.0|ms
+    project.model.predict.rows_out:1000|c
+    project.mssql.read.batch_size:20000|g
+
+    Sends never block the run or raise.
+    """
+
+    def __init__(self, address: str, prefix: str) -> None:
+        """Initialize statsd."""
+        host, port = address.rsplit(":", 1)
+        self.address = (host, int(port))
+        self.prefix = prefix
+        self._socket = socket(AF_INET, SOCK_DGRAM)
+        self._socket.setblocking(False)
+
+    def __call__(self, record: Span) -> None:
+        """Send span."""
+        name = "%s.%s" % (self.prefix, record.name)
+        lines = ["%s.count:1|c" % name]
+        for key, value, kind in (
+            ("wall", record.wall, "ms"),
+            ("cpu", record.cpu, "ms"),
+        ):
+            if value is not None:
+                lines.append("%s.%s:%f|%s" % (name, key, value * 1000, kind))
+        for key, value, kind in (
+            ("rows_in", record.rows_in, "c"),
+            ("rows_out", record.rows_out, "c"),
+            ("rss_delta", record.rss_delta, "g"),
+        ):
+            if value is not None:
+                lines.append("%s.%s:%d|%s" % (name, key, value, kind))
+        if record.error:
+            lines.append("%s.errors:1|c" % name)
+        self.send(lines)
+
+    def gauge(self, metric: str, name: str, value) -> None:
+        """Send gauge metric of name."""
+        self.send(["%s.%s.%s:%s|g" % (self.prefix, name, metric, value)])
+
+    def send(self, lines: list) -> None:
+        """Send lines in one datagram."""
+        try:
+            self._socket.sendto("\n".join(lines).encode(), self.address)
+        except OSError:
+            pass
+
+    def flush(self) -> None:
+        """Flush."""
+
+
+class Recorder:
+    """Recorder.
+
+    Keep the spans and gauges of a process, to replay them in another
+        (see Telemetry.replay).
+    """
+
+    def __init__(self) -> None:
+        """Initialize recorder."""
+        self.records = []
+
+    def __call__(self, record: Span) -> None:
+        """Keep span."""
+        self.records.append(record)
+
+    def gauge(self, metric: str, name: str, value) -> None:
+        """Keep gauge."""
+        self.records.append((metric, name, value))
+
+    def flush(self) -> None:
+        """Flush."""
+
+
+class Telemetry(Configurable):
+    """Telemetry.
+
+    Spans around the units of work of each run (service, model,
+        inputs, model.predict, outputs, mssql.query, mongo.write, ...),
+        passed to each hook when they end:
+
+    telemetry:
+      log: true  # json log line per span
+      prefix: project
+      textfile: /var/lib/node_exporter/textfile/project.prom
+      statsd: localhost:8125
+
+    with span("model.predict", rows_in=rows(batch)) as each:
+        predictions = self.predict(batch)
+        each.rows_out = rows(predictions)
+
+    predictions = timed("model.predict", self.predict, batch)
+
+    Hooks are callables of a span with a flush method, and optionally a
+        gauge method for values such as batch sizes; append your own
+        to TELEMETRY.hooks. Flush runs after each service run.
+    Hooks that aggregate in memory until flush set REPLAY = True, so
+        spans of forked workers (see Shards) reach them in the parent.
+    The process-wide TELEMETRY is replaced with install.
+    """
+
+    @classmethod
+    def from_cfg(cls, cfg: dict) -> Telemetry:
+        """Return telemetry from cfg."""
+        if cfg is None:
+            cfg = {}
+        prefix = cfg.get("prefix", "project")
+        hooks = []
+        if cfg.get("log", True):
+            hooks.append(JsonLog())
+        if cfg.get("textfile") is not None:
+            hooks.append(Textfile(cfg["textfile"], prefix))
+        if cfg.get("statsd") is not None:
+            hooks.append(Statsd(cfg["statsd"], prefix))
+        return cls(hooks)
+
+    @classmethod
+    def patch_args(cls, args: Namespace, cfg: dict) -> dict:
+        """Patch args into cfg."""
+        return cfg
+
+    def __init__(self, hooks: list = None) -> None:
+        """Initialize telemetry."""
+        self.hooks = [JsonLog()] if hooks is None else hooks
+        self._local = local()
+
+    @contextmanager
+    def span(self, name: str, rows_in=None):
+        """Contextmanager recording a span."""
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        each = Span(name, stack[-1] if stack else None, rows_in)
+        stack.append(name)
+        before, cpu, start = rss(), thread_time(), perf_counter()
+        try:
+            yield each
+        except BaseException as e:
+            each.error = type(e).__name__
+            raise
+        finally:
+            each.wall = round(perf_counter() - start, 6)
+            each.cpu = round(thread_time() - cpu, 6)
+            each.rss_delta = rss() - before
+            stack.pop()
+            for hook in self.hooks:
+                hook(each)
+
+    def timed(self, name: str, func: Callable, *args, **kwargs):
+        """Return result of func in a span, with rows of args and result."""
+        counts = [rows(each) for each in args]
+        counts = [each for each in counts if each is not None]
+        with self.span(name, sum(counts) if counts else None) as each:
+            result = func(*args, **kwargs)
+            each.rows_out = rows(result)
+            return result
+
+    def timed_iter(self, name: str, iterable: Iterable):
+        """Yield items of iterable, each produced in a span."""
+        iterator = iter(iterable)
+        while True:
+            with self.span(name) as each:
+                item = next(iterator, StopIteration)
+                if item is not StopIteration:
+                    each.rows_out = rows(item)
+            if item is StopIteration:
+                return
+            yield item
+
+    def gauge(self, metric: str, name: str, value) -> None:
+        """Pass gauge metric of name to the hooks that record gauges."""
+        for hook in self.hooks:
+            each = getattr(hook, "gauge", None)
+            if each is not None:
+                each(metric, name, value)
+
+    def replay(self, records: list) -> None:
+        """Pass spans and gauges recorded in another process to REPLAY hooks.
+
+        Other hooks already emitted them from that process.
+        """
+        hooks = [each for each in self.hooks if getattr(each, "REPLAY", False)]
+        for record in records:
+            for hook in hooks:
+                if isinstance(record, Span):
+                    hook(record)
+                else:
+                    hook.gauge(*record)
+
+    def flush(self) -> None:
+        """Flush hooks."""
+        for hook in self.hooks:
+            try:
+                hook.flush()
+            except OSError as e:
+                logger.warning(e)
+
+
+TELEMETRY = Telemetry()
+
+
+def install(telemetry: Telemetry) -> None:
+    """Replace the process-wide TELEMETRY."""
+    global TELEMETRY  # pylint: disable=global-statement
+    TELEMETRY = telemetry
+
+
+def span(name: str, rows_in=None):
+    """Return a span contextmanager of the process-wide TELEMETRY."""
+    return TELEMETRY.span(name, rows_in)
+
+
+def timed(name: str, func: Callable, *args, **kwargs):
+    """Return result of func in a span of the process-wide TELEMETRY."""
+    return TELEMETRY.timed(name, func, *args, **kwargs)
+
+
+def timed_iter(name: str, iterable: Iterable):
+    """Yield items of iterable in spans of the process-wide TELEMETRY."""
+    return TELEMETRY.timed_iter(name, iterable)
+
+
+def traced(name: str) -> Callable:
+    """Return decorator running func in spans of the process-wide TELEMETRY.
+
+    @classmethod
+    @traced("mssql.query")
+    def query_to_df(cls, cursor, query, ...):
+    """
+
+    def wrapper(func):
+        """Return wrapped func."""
+
+        @wraps(func)
+        def wrapped(*args, **kwargs):
+            """Return func result."""
+            return TELEMETRY.timed(name, func, *args, **kwargs)
+
+        return wrapped
+
+    return wrapper
+
+
+def gauge(metric: str, name: str, value) -> None:
+    """Record a gauge with the process-wide TELEMETRY."""
+    TELEMETRY.gauge(metric, name, value)
+
+
+@contextmanager
+def recording():
+    """Yield a Recorder of the spans and gauges of the process TELEMETRY."""
+    recorder = Recorder()
+    hooks = TELEMETRY.hooks
+    hooks.append(recorder)
+    try:
+        yield recorder
+    finally:
+        hooks.remove(recorder)
+
+
+def replay(records: list) -> None:
+    """Replay records of another process in the process-wide TELEMETRY."""
+    TELEMETRY.replay(records)
+
+
+def flush() -> None:
+    """Flush the process-wide TELEMETRY."""
+    TELEMETRY.flush()
@@ -0,0 +1,186 @@
+"""Watermark."""
+
+from __future__ import annotations
+
+from argparse import Namespace
+from datetime import datetime, timezone
+from logging import getLogger
+from os import getenv
+
+from pymongo.errors import DuplicateKeyError
+
+from .mongo import Mongo, retry_on_reconnect
+from .shard import scope
+
+logger = getLogger(__name__)
+
+
+def watermark_from_str(value: str) -> object:
+    """Return int or datetime watermark from a command line string."""
+    try:
+        return int(value)
+    except ValueError:
+        return datetime.fromisoformat(value)
+
+
+class Watermarks(Mongo):
+    """Watermarks.
+
+    Last processed id or timestamp per input, stored in the output mongo,
+        so each run reads only rows after the previous run:
+
+    inputs:
+      watermarks:
+        uri: mongodb://...  # defaults to OUTPUT_URI
+        collections:
+          watermarks: watermarks
+
+    Inputs read half-open intervals (from_id, to_id], where from_id is
+        None on the first run (apply the lookback window instead):
+
+    from_id, to_id = watermarks.interval("labs", max_id)
+    ... where id > %(from_id)s and id <= %(to_id)s
+
+    The service commits the upper bounds after the outputs are written
+        (see Inputs.interval and Inputs.commit), so a failed run is read
+        again by the next run:
+
+    watermarks.commit({"labs": to_id})
+
+    Each watermark has a single writer: commits only move it forward
+        ($max), so a second writer that failed would still see it moved
+        past rows it never processed. Each document records its
+        writer, the nomad allocation index (NOMAD_ALLOC_INDEX, or the
+        Shards allocation), and a commit by another writer raises
+        ValueError. Sharded allocations each write their own keys.
+
+    Replay reprocesses an arbitrary interval without moving watermarks:
+
+    $ project --replay-from 1000 --replay-to 2000
+    """
+
+    ARGS = {
+        ("REPLAY_FROM", "--replay-from"): {
+            "dest": "replay_from",
+            "help": "Replay from this id or iso timestamp (exclusive).",
+            "type": str,
+        },
+        ("REPLAY_TO", "--replay-to"): {
+            "dest": "replay_to",
+            "help": "Replay to this id or iso timestamp (inclusive).",
+            "type": str,
+        },
+    }
+
+    @classmethod
+    def from_cfg(cls, cfg: dict) -> Watermarks:
+        """Return watermarks from cfg."""
+        watermarks = super().from_cfg(cfg)
+        replay = cfg.get("replay")
+        if replay is not None:
+            watermarks.replay = tuple(
+                watermark_from_str(str(replay[key])) for key in ("from", "to")
+            )
+        return watermarks
+
+    @classmethod
+    def patch_args(cls, args: Namespace, cfg: dict) -> dict:
+        """Patch args into cfg."""
+        if cfg is None:
+            cfg = {}
+        cfg.setdefault("collections", {"watermarks": "watermarks"})
+        output_uri = getattr(args, "output_uri", None)
+        if cfg.get("uri") is None and output_uri is not None:
+            cfg["uri"] = output_uri
+        if args.replay_from is not None or args.replay_to is not None:
+            if args.replay_from is None or args.replay_to is None:
+                raise ValueError("Replay requires --replay-from and -to")
+            cfg["replay"] = {"from": args.replay_from, "to": args.replay_to}
+        return cfg
+
+    def __init__(self, *args, replay: tuple = None, **kwargs) -> None:
+        """Initialize watermarks."""
+        super().__init__(*args, **kwargs)
+        self.replay = replay
+
+    def interval(self, name: str, to_value) -> tuple:
+        """Return (from_value, to_value] to read for input name.
+
+        In replay mode, return the replay interval.
+        """
+        if self.replay is not None:
+            return self.replay
+        return self.get(name), to_value
+
+    def commit(self, values: dict) -> None:
+        """Advance watermarks of inputs, unless replaying.
+
+        Watermarks only move forward.
+        """
+        if self.replay is not None:
+            return
+        for name, value in values.items():
+            self.set(name, value)
+
+    @classmethod
+    def key(cls, name: str) -> str:
+        """Return the _id of the watermark of input name.
+
+        Allocations of a sharded run read disjoint shards of the same
+            rows, so each keeps its own watermark, name#allocation/count
+            (see Shards), and one failing never skips the rows of its
+            shards.
+        """
+        each = scope()
+        if each is None or each[1] == 1:
+            return name
+        return "%s#%d/%d" % (name, *each)
+
+    @classmethod
+    def writer(cls) -> str:
+        """Return the writer of this process's watermarks."""
+        each = scope()
+        if each is not None:
+            return str(each[0])
+        return getenv("NOMAD_ALLOC_INDEX", "0")
+
+    @retry_on_reconnect()
+    def get(self, name: str) -> object:
+        """Return watermark of input name, None when there is none."""
+        with self.collections() as collections:
+            document = collections.watermarks.find_one({"_id": self.key(name)})
+        if document is None:
+            return None
+        return document["value"]
+
+    @retry_on_reconnect()
+    def set(self, name: str, value) -> None:
+        """Set watermark of input name if it is greater.
+
+        Raise ValueError when another writer owns the watermark.
+        """
+        key, writer = self.key(name), self.writer()
+        with self.collections() as collections:
+            try:
+                collections.watermarks.update_one(
+                    {"_id": key, "writer": {"$in": [writer, None]}},
+                    {
+                        "$max": {"value": value},
+                        "$set": {
+                            "updated_on": datetime.now(timezone.utc),
+                            "writer": writer,
+                        },
+                    },
+                    upsert=True,
+                )
+            except DuplicateKeyError:  # a document of another writer
+                raise ValueError(
+                    "Watermark %s has another writer than %s" % (key, writer)
+                ) from None
+        logger.info('{"watermark": {"name": "%s", "value": "%s"}}', key, value)
+
+    def ping(self) -> bool:
+        """Ping."""
+        with self.collections() as collections:
+            collections.watermarks.find_one({})
+        return True
@@ -0,0 +1,32 @@
+"""Test batching."""
+
+from project.batching import Adaptive, batches
+
+
+def test_adaptive_targets_latency():
+    """Test sizes shrink at once toward latency and grow by growth."""
+    each = Adaptive("test", initial=1000, minimum=10, latency=1.0)
+    assert each.observe(1000, 10.0, 1.0) == 100  # 0.01 s per row
+    each = Adaptive("test", initial=1000, minimum=10, latency=1.0)
+    assert each.observe(1000, 0.001, 1.0) == 2000  # at most 2x per batch
+
+
+def test_adaptive_bounds():
+    """Test sizes stay within [minimum, maximum] and the memory ceiling."""
+    each = Adaptive("test", initial=1000, minimum=10, maximum=1500)
+    assert each.observe(1000, 0.001, 1.0) == 1500
+    assert each.observe(1500, 1500.0, 1.0) == 10  # averaged to 0.5 s/row
+    each = Adaptive("test", initial=1000, minimum=1, memory=1000)
+    assert each.observe(1000, 0.001, 100.0) <= 10  # 1000 bytes / 100
+
+
+def test_batches_until_empty():
+    """Test batches yields fetches of an explicit size until empty."""
+    rows = list(range(5))
+
+    def fetch(size):
+        batch = rows[:size]
+        del rows[:size]
+        return batch
+
+    assert list(batches(fetch, "test", 2)) == [[0, 1], [2, 3], [4]]
@@ -0,0 +1,19 @@
+"""Test benchmark."""
+
+from project.benchmark import Collection, benchmark_service
+
+
+def test_collection_is_pymongo():
+    """Test the synthetic collection behaves as a pymongo Collection."""
+    each = Collection("predictions", 2)
+    assert each.name == "predictions"
+    assert each.shape.name == "predictions.shape"  # a sub-collection
+    assert each.find_one()["id"] == 0
+
+
+def test_benchmark_service():
+    """Test a service run writes every row through Mongo.write_df."""
+    for pipeline in (False, True):
+        result = benchmark_service(1000, size=300, repeat=1, pipeline=pipeline)
+        assert result["rows"] == 1000
+        assert result["stages"]["output.mongo"]["calls"] >= 1
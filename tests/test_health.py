@@ -0,0 +1,44 @@
+"""Test health."""
+
+from subprocess import run
+from sys import executable
+from time import monotonic
+
+from pytest import raises
+
+from project.health import Health, Unhealthy
+
+
+def test_health_ok():
+    """Test a report of healthy pings."""
+    report = Health()({"a": lambda: True, "b": lambda: None})
+    assert report["ok"] and report["a"]["ok"] and report["b"]["ok"]
+
+
+def test_health_error_is_cause():
+    """Test the first error of a ping is the cause of Unhealthy."""
+
+    def ping():
+        raise ValueError("down")
+
+    with raises(Unhealthy) as info:
+        Health()({"a": ping, "b": lambda: False})
+    assert isinstance(info.value.__cause__, ValueError)
+    assert info.value.report["b"]["ok"] is False
+
+
+def test_hung_ping_does_not_block_exit():
+    """Test a hung ping neither delays Unhealthy nor the process exit."""
+    code = (
+        "from time import sleep\n"
+        "from project.health import Health, Unhealthy\n"
+        "try:\n"
+        "    Health(timeout=0.2)({'hung': lambda: sleep(30)})\n"
+        "except Unhealthy as e:\n"
+        "    assert e.report['hung']['error'] == 'timeout'\n"
+        "else:\n"
+        "    raise AssertionError('healthy')\n"
+    )
+    start = monotonic()
+    run([executable, "-c", code], check=True, timeout=20)
+    assert monotonic() - start < 10
@@ -0,0 +1,37 @@
+"""Test import time."""
+
+from json import loads
+from subprocess import run
+from sys import executable
+
+IMPORT_SECONDS = 1.0  # about 0.3 on a laptop
+LAZY = ("numpy", "pandas", "pyarrow", "setuptools_scm")
+
+
+def import_project() -> tuple:
+    """Return (import seconds, loaded lazy modules) in a new interpreter."""
+    code = (
+        "import json, sys\n"
+        "from time import perf_counter\n"
+        "start = perf_counter()\n"
+        "import project\n"
+        "seconds = perf_counter() - start\n"
+        "print(json.dumps([seconds, [each for each in %r "
+        "if each in sys.modules]]))\n" % (LAZY,)
+    )
+    result = run(
+        [executable, "-c", code], capture_output=True, check=True, text=True
+    )
+    return loads(result.stdout)
+
+
+def test_import_time():
+    """Test import project stays under IMPORT_SECONDS."""
+    seconds = min(import_project()[0] for _ in range(3))
+    assert seconds < IMPORT_SECONDS
+
+
+def test_import_is_lazy():
+    """Test import project loads no heavy backend."""
+    _, loaded = import_project()
+    assert loaded == []
@@ -0,0 +1,147 @@
+"""Test mongo."""
+
+from datetime import datetime, timezone
+
+import pandas as pd
+from bson import ObjectId
+from mongomock import MongoClient
+from mongomock.collection import BulkOperationBuilder
+from pymongo.errors import BulkWriteError
+from pytest import fixture, raises
+
+from project.mongo import Mongo
+from project.telemetry import rows
+
+SCHEMA = {
+    "id": "id",
+    "on": "on",
+    "patient_id": "patient.id",
+    "ref": "ref",
+    "score": ("score", "float64"),
+}
+
+
+@fixture(name="collection")
+def fixture_collection(monkeypatch):
+    """Return an empty mongomock collection with tz-aware datetimes."""
+    add_replace = BulkOperationBuilder.add_replace
+
+    def compatible(self, *args, sort=None, **kwargs):
+        """Add replace, without the sort of newer pymongo."""
+        assert sort is None
+        return add_replace(self, *args, **kwargs)
+
+    monkeypatch.setattr(BulkOperationBuilder, "add_replace", compatible)
+    return MongoClient(tz_aware=True).get_database("test")["predictions"]
+
+
+def test_rows_of_collection(collection):
+    """Test rows is None for a collection, not its truth value."""
+    assert rows(collection) is None
+
+
+def test_write_df_to_collection(collection):
+    """Test write_df counts rows written to a collection."""
+    df = pd.DataFrame({"id": [1, 2, 3], "score": [0.1, 0.2, 0.3]})
+    counts = Mongo.write_df(collection, df)
+    assert counts["inserted"] == 3
+    assert collection.count_documents({}) == 3
+
+
+def test_write_df_upserts_keys(collection):
+    """Test write_df with keys replaces matching documents."""
+    df = pd.DataFrame({"id": [1, 2], "score": [None, 0.1]})
+    assert Mongo.write_df(collection, df, keys=("id",))["upserted"] == 2
+    df = pd.DataFrame({"id": [2, 3], "score": [0.5, 0.6]})
+    counts = Mongo.write_df(collection, df, keys=("id",))
+    assert (counts["matched"], counts["upserted"]) == (1, 1)
+    out = Mongo.bson_to_df(collection.find({}).sort("id"), SCHEMA)
+    assert out.id.tolist() == [1, 2, 3]
+    assert out.score.isna().tolist() == [True, False, False]
+    assert out.score.tolist()[1:] == [0.5, 0.6]
+
+
+def test_round_trip_datetimes(collection):
+    """Test tz-aware datetimes round trip as datetime64[ns, UTC]."""
+    on = pd.to_datetime(["2020-01-01T00:00Z", "2020-01-02T05:00Z"])
+    Mongo.write_df(collection, pd.DataFrame({"id": [1, 2], "on": on}))
+    out = Mongo.bson_to_df(collection.find({}).sort("id"), SCHEMA)
+    assert str(out.on.dtype) == "datetime64[ns, UTC]"
+    assert out.on.tolist() == on.tolist()
+
+
+def test_bson_to_df_nested_and_object_ids(collection):
+    """Test nested paths, missing keys and ObjectIds of documents."""
+    ref = ObjectId()
+    collection.insert_many(
+        [
+            {"id": 1, "patient": {"id": 7}, "ref": ref},
+            {"id": 2, "patient": None},
+            {
+                "id": 3,
+                "on": datetime(2020, 1, 1, tzinfo=timezone.utc),
+                "patient": {"id": 9},
+            },
+        ]
+    )
+    out = Mongo.bson_to_df(collection.find({}).sort("id"), SCHEMA, size=2)
+    assert out.patient_id.tolist()[::2] == [7, 9]
+    assert out.patient_id.isna().tolist() == [False, True, False]
+    assert out.ref.tolist()[0] == str(ref)
+    assert out.ref.isna().tolist()[1:] == [True, True]
+
+
+def test_bson_to_df_discovers_columns(collection):
+    """Test columns without a schema are the keys in order seen."""
+    collection.insert_many([{"_id": 1, "a": 1}, {"_id": 2, "b": "x"}])
+    out = Mongo.bson_to_df(collection.find({}).sort("_id"))
+    assert out.columns.tolist() == ["_id", "a", "b"]
+    assert out.b.isna().tolist() == [True, False]
+
+
+def duplicate(index: int, key: str = "_id") -> dict:
+    """Return a duplicate key write error of op index."""
+    return {"code": 11000, "index": index, "keyPattern": {key: 1}}
+
+
+def bulk_write_error(*write_errors) -> BulkWriteError:
+    """Return a bulk write error of write_errors."""
+    return BulkWriteError(
+        {
+            "nInserted": 1,
+            "nMatched": 0,
+            "nModified": 0,
+            "nUpserted": 0,
+            "writeConcernErrors": [],
+            "writeErrors": list(write_errors),
+        }
+    )
+
+
+def test_retried_duplicate_ids_count_as_inserted():
+    """Test duplicate _ids of a retried insert are re-applied inserts."""
+    ops = Mongo.write_ops([{"a": 1}, {"a": 2}])
+    counts = Mongo.bulk_error_counts(bulk_write_error(duplicate(1)), ops, True)
+    assert counts["inserted"] == 2
+
+
+def test_other_duplicates_raise():
+    """Test first attempts and other unique indexes raise."""
+    ops = Mongo.write_ops([{"a": 1}, {"a": 2}])
+    with raises(BulkWriteError):
+        Mongo.bulk_error_counts(bulk_write_error(duplicate(1)), ops, False)
+    with raises(BulkWriteError):
+        Mongo.bulk_error_counts(bulk_write_error(duplicate(1, "a")), ops, True)
+
+
+def test_from_cfg_rejects_unknown_pool_options():
+    """Test unknown pool keys fail at config time, not on connect."""
+    cfg = {"collections": {"labs": "labs"}, "uri": "mongodb://localhost/test"}
+    assert (
+        Mongo.from_cfg({**cfg, "pool": {"max_pool_size": 5}}).pool[
+            "max_pool_size"
+        ]
+        == 5
+    )
+    with raises(ValueError):
+        Mongo.from_cfg({**cfg, "pool": {"maxPoolSize": 5}})
@@ -0,0 +1,33 @@
+"""Test pipeline."""
+
+from pytest import raises
+
+from project.pipeline import Pipeline
+
+
+def test_pipeline_writes_in_order():
+    """Test every batch is processed and written in order."""
+    written = []
+    report = Pipeline(queue_size=1)(range(10), lambda x: x * 2, written.append)
+    assert written == [x * 2 for x in range(10)]
+    assert report["process"]["items"] == 10
+
+
+def test_pipeline_raises_first_error():
+    """Test an error in a stage stops the pipeline and is raised."""
+
+    def process(batch):
+        if batch == 3:
+            raise ValueError(batch)
+        return batch
+
+    with raises(ValueError):
+        Pipeline()(range(10), process, lambda _: None)
+
+
+def test_pipeline_requires_bounded_queues():
+    """Test queue_size 0, an unbounded Queue, is rejected."""
+    with raises(ValueError):
+        Pipeline.from_cfg({"queue_size": 0})
+    with raises(ValueError):
+        Pipeline(processes=-1)
@@ -0,0 +1,106 @@
+"""Test retry."""
+
+from time import sleep
+
+from pymssql import OperationalError
+from pytest import raises
+
+from project.mssql import retry_on_operational_error
+from project.retry import Breaker, CircuitOpen, Retry, counters
+
+
+class Flaky:  # pylint: disable=too-few-public-methods
+    """Callable raising error failures times, then returning True."""
+
+    def __init__(self, error: Exception, failures: int) -> None:
+        """Initialize flaky."""
+        self.error = error
+        self.failures = failures
+        self.calls = 0
+
+    def __call__(self) -> bool:
+        """Raise error or return True."""
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error
+        return True
+
+
+def test_delay_jitter_bounds():
+    """Test delays are within [0, min(cap, backoff * 2 ** attempt)]."""
+    policy = Retry("test.jitter", (ValueError,), backoff=0.5, cap=3.0)
+    for attempt, bound in ((0, 0.5), (1, 1.0), (2, 2.0), (3, 3.0), (9, 3.0)):
+        delays = [policy.delay(attempt) for _ in range(200)]
+        assert all(0 <= each <= bound for each in delays)
+        assert max(delays) > bound / 2  # jittered, not fixed at zero
+
+
+def test_retries_then_succeeds():
+    """Test transient errors are retried up to retries times."""
+    flaky = Flaky(ValueError(), 2)
+    policy = Retry("test.retries", (ValueError,), retries=2, backoff=0.001)
+    assert policy(flaky)() is True
+    assert flaky.calls == 3
+    flaky = Flaky(ValueError(), 3)
+    with raises(ValueError):
+        policy(flaky)()
+    assert flaky.calls == 3
+    assert counters()["test.retries"]["exhausted"] == 1
+
+
+def test_retry_budget():
+    """Test no retry starts after budget seconds."""
+    flaky = Flaky(ValueError(), 10)
+    policy = Retry(
+        "test.budget", (ValueError,), retries=10, backoff=10.0, budget=0.0
+    )
+    with raises(ValueError):
+        policy(flaky)()
+    assert flaky.calls == 1
+
+
+def test_breaker_opens_and_half_opens():
+    """Test the circuit opens at threshold and lets one trial through."""
+    breaker = Breaker("test.breaker", threshold=2, reset=0.05)
+    breaker.failure()
+    assert breaker.allow()
+    breaker.failure()
+    assert not breaker.allow()
+    sleep(0.06)
+    assert breaker.admit() == (True, True)
+    assert breaker.admit() == (False, False)  # one trial at a time
+    breaker.failure()
+    assert not breaker.allow()
+    sleep(0.06)
+    assert breaker.admit() == (True, True)
+    breaker.success()
+    assert breaker.admit() == (True, False)
+
+
+def test_open_circuit_fails_fast():
+    """Test calls through an open breaker raise CircuitOpen."""
+    breaker = Breaker("test.open", threshold=1, reset=60)
+    flaky = Flaky(ValueError(), 0)
+    policy = Retry("test.open", (ValueError,), breaker=breaker)
+    breaker.failure()
+    with raises(CircuitOpen):
+        policy(flaky)()
+    assert flaky.calls == 0
+
+
+def test_trial_released_on_other_errors():
+    """Test a trial raising a non transient error frees the next trial."""
+    breaker = Breaker("test.release", threshold=1, reset=0.0)
+    breaker.failure()
+    policy = Retry("test.release", (ValueError,), breaker=breaker)
+    with raises(KeyError):
+        policy(Flaky(KeyError(), 1))()
+    assert policy(Flaky(KeyError(), 0))() is True
+
+
+def test_login_failed_is_not_retried():
+    """Test mssql login failures (18456) are permanent."""
+    flaky = Flaky(OperationalError(18456, b"Login failed"), 10)
+    with raises(OperationalError):
+        retry_on_operational_error(backoff=0.001)(flaky)()
+    assert flaky.calls == 1
@@ -0,0 +1,86 @@
+"""Test shard."""
+
+from pytest import fixture
+
+from project import shard as sharding, telemetry
+from project.shard import Shard, Shards
+from project.telemetry import Telemetry, Textfile, span
+from project.watermark import Watermarks
+
+
+class Service:
+    """Service of a model recording one span per shard."""
+
+    def __init__(self) -> None:
+        """Initialize service."""
+        self.inputs = Inputs()
+        self.committed = []
+
+    @classmethod
+    def model(cls, inputs, outputs) -> None:
+        """Run model."""
+        with span("work", 1):
+            outputs(inputs.read())
+
+    def outputs(self, predictions) -> None:
+        """Discard predictions."""
+
+    def commit(self, values: dict = None) -> None:
+        """Record committed watermarks."""
+        self.committed.append(values)
+
+
+class Inputs:  # pylint: disable=too-few-public-methods
+    """Inputs with a pending watermark per shard."""
+
+    def __init__(self) -> None:
+        """Initialize inputs."""
+        self.pending = {}
+
+    def read(self) -> int:
+        """Return the shard index, pending a watermark of 100 + index."""
+        index = sharding.current().index
+        self.pending = {"labs": 100 + index}
+        return index
+
+
+@fixture(name="textfile")
+def fixture_textfile(tmp_path):
+    """Yield a Textfile hook installed in the process TELEMETRY."""
+    previous = telemetry.TELEMETRY
+    hook = Textfile(str(tmp_path / "project.prom"), "project")
+    telemetry.install(Telemetry([hook]))
+    try:
+        yield hook
+    finally:
+        telemetry.install(previous)
+
+
+def test_normalize_is_dtype_independent():
+    """Test equal keys of any dtype are in the same shard."""
+    each = Shard(1, 7, "id")
+    assert each.mask([42, 7]).tolist() == each.mask([42.0, 7.0]).tolist()
+    assert each.mask([42, 7]).tolist() == each.mask(["42", "7"]).tolist()
+
+
+def test_shards_replay_worker_spans(textfile):
+    """Test spans of forked workers reach the parent's Textfile."""
+    service = Service()
+    Shards("id", 4, processes=2)(service)
+    assert textfile.metrics["work"]["count"] == 4
+    assert service.committed == [{"labs": 100}]
+
+
+def test_watermark_key_per_allocation():
+    """Test allocations of a sharded run keep their own watermarks."""
+    assert Watermarks.key("labs") == "labs"
+    sharding.SCOPE = (1, 3)
+    try:
+        assert Watermarks.key("labs") == "labs#1/3"
+    finally:
+        sharding.SCOPE = None
+    sharding.SCOPE = (0, 1)
+    try:
+        assert Watermarks.key("labs") == "labs"
+    finally:
+        sharding.SCOPE = None
@@ -0,0 +1,57 @@
+"""Test watermark."""
+
+from contextlib import contextmanager
+
+from mongomock import MongoClient
+from pytest import fixture, raises
+
+from project.watermark import Watermarks
+
+
+class MockWatermarks(Watermarks):
+    """Watermarks in mongomock."""
+
+    CLIENT = MongoClient("mongodb://localhost/test")
+
+    @contextmanager
+    def connection(self):
+        """Yield the mongomock client."""
+        yield self.CLIENT
+
+
+@fixture(name="watermarks")
+def fixture_watermarks():
+    """Return empty watermarks."""
+    MockWatermarks.CLIENT.test.watermarks.delete_many({})
+    return MockWatermarks.from_cfg(
+        {
+            "collections": {"watermarks": "watermarks"},
+            "uri": "mongodb://localhost/test",
+        }
+    )
+
+
+def test_watermarks_only_advance(watermarks):
+    """Test commits only move watermarks forward."""
+    assert watermarks.interval("labs", 10) == (None, 10)
+    watermarks.commit({"labs": 10})
+    watermarks.commit({"labs": 5})
+    assert watermarks.interval("labs", 20) == (10, 20)
+
+
+def test_watermarks_single_writer(watermarks, monkeypatch):
+    """Test a second writer of a watermark raises."""
+    monkeypatch.setenv("NOMAD_ALLOC_INDEX", "0")
+    watermarks.commit({"labs": 10})
+    monkeypatch.setenv("NOMAD_ALLOC_INDEX", "1")
+    with raises(ValueError):
+        watermarks.commit({"labs": 20})
+    assert watermarks.get("labs") == 10
+
+
+def test_watermarks_replay(watermarks):
+    """Test replay reads its interval and commits nothing."""
+    watermarks.replay = (1, 2)
+    assert watermarks.interval("labs", 10) == (1, 2)
+    watermarks.commit({"labs": 10})
+    assert watermarks.get("labs") is None